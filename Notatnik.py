@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-import threading
+import time
 import tkinter as tk
 from tkinter import messagebox, ttk
 
-import requests
 import tkintermapview
-from bs4 import BeautifulSoup
+
+from core import PL_CENTER, Employee, Store, Supplier, wikigeocode
+from events import UPDATED
+from frontend import TkGeocoder, after_first_window, verify_presets
+from repository import Repository
+from routes import RoutePlanner
 
 # ─────────  KONFIG  ─────────
 USER_CREDENTIALS = {"admin": "admin123"}
@@ -17,76 +21,8 @@ PRESET_STORES = [
     ("Eko-Sklep Południe",  "Kraków, Rynek Główny 12",    50.0619, 19.9373),
 ]
 
-PL_CENTER = (52.2297, 21.0122)
-
-# ─────────  GEOKODOWANIE  ─────────
-def nominatim_geocode(query: str) -> tuple[float, float] | None:
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {"q": query, "format": "json", "limit": 1}
-    headers = {"User-Agent": "ShopManagerApp/1.1 (kontakt@example.com)"}
-    try:
-        data = requests.get(url, params=params, headers=headers, timeout=6).json()
-        if data:
-            return float(data[0]["lat"]), float(data[0]["lon"])
-    except Exception:
-        pass
-    return None
-
-
-def wikigeocode(city: str) -> tuple[float, float]:
-    try:
-        html = requests.get(f"https://pl.wikipedia.org/wiki/{city.strip()}", timeout=6).text
-        soup = BeautifulSoup(html, "html.parser")
-        lat = soup.select(".latitude")[1].text.replace(",", ".")
-        lon = soup.select(".longitude")[1].text.replace(",", ".")
-        return float(lat), float(lon)
-    except Exception:
-        return PL_CENTER
-
-# ─────────  MODELE  ─────────
-class Store:
-    def __init__(self, name: str, address: str):
-        self.name, self.address = name, address
-        self.employees: list[Employee] = []
-        self.suppliers: list[Supplier] = []
-        self.marker = None
-        coords = nominatim_geocode(address)
-        if coords is None:
-            raise ValueError(f"Adres „{address}” nie znaleziony w OSM.")
-        self.lat, self.lon = coords
-
-    @classmethod
-    def raw(cls, name: str, address: str, lat: float, lon: float) -> "Store":
-        obj = object.__new__(cls)
-        obj.name, obj.address = name, address
-        obj.lat, obj.lon = lat, lon
-        obj.employees, obj.suppliers, obj.marker = [], [], None
-        return obj
-
-    def __str__(self) -> str:
-        return f"{self.name} ({self.address})"
-
-
-class Employee:
-    def __init__(self, fullname: str, position: str, location: str, store: Store | None = None):
-        self.fullname, self.position, self.location = fullname, position, location
-        self.lat, self.lon = wikigeocode(location)
-        self.store = store
-        self.marker = None
-
-    def __str__(self):
-        return f"{self.fullname} – {self.position} ({self.location})"
-
-
-class Supplier:
-    def __init__(self, name: str, category: str, location: str, store: Store | None = None):
-        self.name, self.category, self.location = name, category, location
-        self.lat, self.lon = wikigeocode(location)
-        self.store = store
-        self.marker = None
-
-    def __str__(self):
-        return f"{self.name} – {self.category} ({self.location})"
+VERIFY_PRESETS = False          # sprawdzanie adresów sklepów startowych w tle
+ROUTE_BUDGET_S = 1.0            # limit czasu na poprawianie trasy dostaw (więcej = krótsza trasa)
 
 # ─────────  LOGOWANIE  ─────────
 def verify_login(username: str, password: str) -> bool:
@@ -103,63 +39,67 @@ def attempt_login() -> None:
 
 # ─────────  GŁÓWNA APP  ─────────
 def launch_main_app() -> None:
-    # centralne listy
-    stores: list[Store] = []
-    employees: list[Employee] = []
-    suppliers: list[Supplier] = []
-
-    # sklepy startowe
-    for n, a, lat, lon in PRESET_STORES:
-        try:
-            st = Store(n, a)
-        except ValueError:
-            st = Store.raw(n, a, lat, lon)
-        st.lat, st.lon = lat, lon
-        stores.append(st)
+    # sieć tylko w pamięci (bez bazy); sklepy startowe z PRESET_STORES – bez geokodowania przed oknem
+    t_start = time.perf_counter()
+    repo = Repository()
+    repo.add_many(Store.raw(n, a, lat, lon) for n, a, lat, lon in PRESET_STORES)
+    # słowniki id → encja
+    stores, employees, suppliers = repo.stores, repo.employees, repo.suppliers
 
     app = tk.Tk()
     app.title("System Zarządzania Sklepami")
     app.geometry("1280x760")
 
-    current_markers: list[tkintermapview.TkinterMapView] = []
+    markers: dict = {}              # encja → marker na mapie
+    route_path = [None]             # narysowana trasa dostaw (jedna naraz)
+    # encje w kolejności wierszy list (Listbox zna tylko indeksy)
+    store_rows: list[Store] = []
+    emp_rows: list[Employee] = []
+    sup_rows: list[Supplier] = []
 
     # ── helpers ─────────────────────────────────────────
     def clear_markers():
-        for m in current_markers:
+        for m in markers.values():
             m.delete()
-        current_markers.clear()
+        markers.clear()
+        if route_path[0] is not None:
+            route_path[0].delete(); route_path[0] = None
+        route_lbl.config(text="")
 
     def fit_map():
-        if not current_markers:
+        if not markers:
             return
-        lats = [m.position[0] for m in current_markers]
-        lons = [m.position[1] for m in current_markers]
+        lats = [m.position[0] for m in markers.values()]
+        lons = [m.position[1] for m in markers.values()]
         map_w.set_position(sum(lats) / len(lats), sum(lons) / len(lons))
-        map_w.set_zoom(6 if len(current_markers) > 4 else 8)
+        map_w.set_zoom(6 if len(markers) > 4 else 8)
+
+    def selected(lb: tk.Listbox, rows: list):
+        sel = lb.curselection()
+        return rows[sel[0]] if sel else None
 
     def refresh_store_lb():
         store_lb.delete(0, tk.END)
-        for i, st in enumerate(stores):
+        store_rows[:] = stores.values()
+        for i, st in enumerate(store_rows):
             store_lb.insert(i, str(st))
 
     def refresh_emp_lb():
         employee_lb.delete(0, tk.END)
-        flt = emp_filter_cmb.get()
-        src = employees if flt == "– Wszystkie –" else (
-            next((s for s in stores if str(s) == flt), None).employees or [])
-        for i, e in enumerate(src):
+        st = repo.store_by_label(emp_filter_cmb.get())      # "– Wszystkie –" → None
+        emp_rows[:] = st.employees if st else employees.values()
+        for i, e in enumerate(emp_rows):
             employee_lb.insert(i, str(e))
 
     def refresh_sup_lb():
         supplier_lb.delete(0, tk.END)
-        flt = sup_filter_cmb.get()
-        src = suppliers if flt == "– Wszystkie –" else (
-            next((s for s in stores if str(s) == flt), None).suppliers or [])
-        for i, s in enumerate(src):
+        st = repo.store_by_label(sup_filter_cmb.get())
+        sup_rows[:] = st.suppliers if st else suppliers.values()
+        for i, s in enumerate(sup_rows):
             supplier_lb.insert(i, str(s))
 
     def sync_store_combos():
-        vals = [str(s) for s in stores]
+        vals = [str(s) for s in stores.values()]
         emp_filter_cmb["values"] = ["– Wszystkie –"] + vals
         sup_filter_cmb["values"] = ["– Wszystkie –"] + vals
         emp_assign_cmb["values"] = ["(brak)"] + vals
@@ -171,43 +111,66 @@ def launch_main_app() -> None:
         view = map_view_cmb.get()
 
         if view == "Sklepy – wszystkie":
-            for st in stores:
-                st.marker = map_w.set_marker(st.lat, st.lon, text=st.name, marker_color_outside="blue")
-                current_markers.append(st.marker)
+            for st in stores.values():
+                markers[st] = map_w.set_marker(st.lat, st.lon, text=st.name, marker_color_outside="blue")
             fit_map()
 
         elif view == "Pracownicy – cała sieć":
-            for e in employees:
-                e.marker = map_w.set_marker(e.lat, e.lon, text=e.fullname, marker_color_outside="orange")
-                current_markers.append(e.marker)
+            for e in employees.values():
+                if e.pending: continue
+                markers[e] = map_w.set_marker(e.lat, e.lon, text=e.fullname, marker_color_outside="orange")
             fit_map()
 
         elif view == "Pracownicy – wybrany sklep":
-            if not store_lb.curselection():
+            st = selected(store_lb, store_rows)
+            if st is None:
                 return
-            st = stores[store_lb.curselection()[0]]
             for e in st.employees:
-                e.marker = map_w.set_marker(e.lat, e.lon, text=e.fullname, marker_color_outside="orange")
-                current_markers.append(e.marker)
+                if e.pending: continue
+                markers[e] = map_w.set_marker(e.lat, e.lon, text=e.fullname, marker_color_outside="orange")
             map_w.set_position(st.lat, st.lon)
             map_w.set_zoom(12)
 
         elif view == "Dostawcy – wybrany sklep":
-            if not store_lb.curselection():
+            st = selected(store_lb, store_rows)
+            if st is None:
                 return
-            st = stores[store_lb.curselection()[0]]
             for s in st.suppliers:
-                s.marker = map_w.set_marker(s.lat, s.lon, text=s.name, marker_color_outside="green")
-                current_markers.append(s.marker)
+                if s.pending: continue
+                markers[s] = map_w.set_marker(s.lat, s.lon, text=s.name, marker_color_outside="green")
             map_w.set_position(st.lat, st.lon)
             map_w.set_zoom(10)
+            plan_route(st)
+
+    def move_markers(changes):
+        "sklep przesunięty (np. weryfikacja adresu) – marker w miejscu, bez przerysowania mapy"
+        for c in changes:
+            if c.type == UPDATED and c.entity in markers:
+                markers[c.entity].set_position(c.entity.lat, c.entity.lon)
 
-    # ── geokoder w wątku ────────────────────────────────
-    def threaded_geocode(addr: str, callback):
-        def job():
-            coords = nominatim_geocode(addr)
-            app.after(0, callback, coords)
-        threading.Thread(target=job, daemon=True).start()
+    # ── trasa dostaw (liczona w osobnym procesie) ───────
+    route_planner = RoutePlanner(lambda fn, *args: app.after(0, fn, *args))
+
+    def plan_route(st):
+        stops = [(s.lat, s.lon) for s in st.suppliers if not s.pending]
+        if not stops:
+            return
+        route_lbl.config(text=f"Trasa: liczenie ({len(stops)} przyst.)…")
+
+        def _draw(order, km):
+            # w międzyczasie mógł zmienić się widok albo wybrany sklep
+            if map_view_cmb.get() != "Dostawcy – wybrany sklep" or selected(store_lb, store_rows) is not st:
+                return
+            if route_path[0] is not None:
+                route_path[0].delete()
+            path = [(st.lat, st.lon), *(stops[i] for i in order), (st.lat, st.lon)]
+            route_path[0] = map_w.set_path(path, color="#2e7d32", width=3)
+            route_lbl.config(text=f"Trasa: {km:.1f} km, {len(stops)} przyst.")
+
+        route_planner.plan((st.lat, st.lon), stops, _draw, budget_s=ROUTE_BUDGET_S)
+
+    # ── geokoder w puli wątków ──────────────────────────
+    geo = TkGeocoder(app, repo)
 
     # ── CRUD sklepów ────────────────────────────────────
     def add_store():
@@ -220,27 +183,24 @@ def launch_main_app() -> None:
             if coords is None:
                 messagebox.showerror("Geokoder", f"Adres „{addr}” nie znaleziono.")
                 return
-            stores.append(Store.raw(name, addr, *coords))
+            repo.add(Store.raw(name, addr, *coords))
             store_name_ent.delete(0, tk.END); store_loc_ent.delete(0, tk.END)
             refresh_store_lb(); sync_store_combos(); refresh_map()
 
-        threaded_geocode(addr, _finish)
+        geo.geocode(addr, _finish)
 
     def del_store():
-        if not store_lb.curselection():
+        st = selected(store_lb, store_rows)
+        if st is None:
             return
-        idx = store_lb.curselection()[0]
-        st = stores.pop(idx)
-        if st.marker: st.marker.delete()
-        for e in list(st.employees): employees.remove(e)
-        for s in list(st.suppliers): suppliers.remove(s)
+        for ent in repo.remove(st): geo.cancel_owner(ent)
         refresh_store_lb(); refresh_emp_lb(); refresh_sup_lb()
         sync_store_combos(); refresh_map()
 
     def edit_store():
-        if not store_lb.curselection():
+        st = selected(store_lb, store_rows)
+        if st is None:
             return
-        st = stores[store_lb.curselection()[0]]
 
         win = tk.Toplevel(app); win.title("Edytuj sklep")
         ttk.Label(win, text="Nazwa:").grid(row=0, column=0, sticky="e")
@@ -259,10 +219,12 @@ def launch_main_app() -> None:
                     messagebox.showerror("Geokoder", f"Adres „{new_addr}” nie znaleziono.")
                     return
                 st.name, st.address, (st.lat, st.lon) = new_name, new_addr, coords
+                repo.update(st)
                 refresh_store_lb(); sync_store_combos(); refresh_map(); win.destroy()
 
-            threaded_geocode(new_addr, _finish)
+            geo.geocode(new_addr, _finish, owner=win)
 
+        geo.cancel_with(win)
         ttk.Button(win, text="Zapisz", command=_save).grid(row=2, columnspan=2, pady=6)
 
     # ── CRUD pracowników ───────────────────────────────
@@ -270,30 +232,23 @@ def launch_main_app() -> None:
         fn, pos, loc = emp_name_ent.get().strip(), emp_pos_ent.get().strip(), emp_loc_ent.get().strip()
         if not fn or not pos or not loc:
             return
-        idx = emp_assign_cmb.current() - 1
-        st = stores[idx] if idx >= 0 else None
-        e = Employee(fn, pos, loc, st)
-        employees.append(e)
-        if st: st.employees.append(e)
+        e = Employee(fn, pos, loc, repo.store_by_label(emp_assign_cmb.get()), resolve=False)
+        repo.add(e)
+        geo.locate(e, loc, lambda: (refresh_emp_lb(), refresh_map()), lookup=wikigeocode)
         for w in (emp_name_ent, emp_pos_ent, emp_loc_ent): w.delete(0, tk.END)
         emp_assign_cmb.set("(brak)"); refresh_emp_lb(); refresh_map()
 
     def del_emp():
-        if not employee_lb.curselection():
+        e = selected(employee_lb, emp_rows)
+        if e is None:
             return
-        flt, idx = emp_filter_cmb.get(), employee_lb.curselection()[0]
-        e = employees.pop(idx) if flt == "– Wszystkie –" else (
-            next(s for s in stores if str(s) == flt).employees.pop(idx))
-        if e.marker: e.marker.delete()
-        if e in employees: employees.remove(e)
+        geo.cancel_owner(e); repo.remove(e)
         refresh_emp_lb(); refresh_map()
 
     def edit_emp():
-        if not employee_lb.curselection():
+        e = selected(employee_lb, emp_rows)
+        if e is None:
             return
-        flt, idx = emp_filter_cmb.get(), employee_lb.curselection()[0]
-        e = employees[idx] if flt == "– Wszystkie –" else (
-            next(s for s in stores if str(s) == flt).employees[idx])
 
         win = tk.Toplevel(app); win.title("Edytuj pracownika")
         for i, (lbl, val) in enumerate([("Imię i nazwisko:", e.fullname),
@@ -305,21 +260,22 @@ def launch_main_app() -> None:
             elif i == 1: pos_ent = ent
             else: loc_ent = ent
         ttk.Label(win, text="Sklep:").grid(row=3, column=0, sticky="e")
-        cmb = ttk.Combobox(win, width=28, state="readonly", values=["(brak)"] + [str(s) for s in stores])
+        cmb = ttk.Combobox(win, width=28, state="readonly", values=["(brak)"] + [str(s) for s in stores.values()])
         cmb.grid(row=3, column=1); cmb.set(str(e.store) if e.store else "(brak)")
 
         def _save():
             e.fullname, e.position = name_ent.get().strip(), pos_ent.get().strip()
             new_loc = loc_ent.get().strip()
-            new_store = stores[cmb.current() - 1] if cmb.current() > 0 else None
-            if e.store is not new_store:
-                if e.store: e.store.employees.remove(e)
-                if new_store: new_store.employees.append(e)
-                e.store = new_store
+            repo.assign(e, repo.store_by_label(cmb.get()))
             if new_loc != e.location:
-                e.location = new_loc; e.lat, e.lon = wikigeocode(new_loc)
+                e.location = new_loc
+                geo.cancel_owner(e)
+                geo.locate(e, new_loc, lambda: (refresh_emp_lb(), refresh_map()), lookup=wikigeocode)
+            repo.update(e)
             refresh_emp_lb(); refresh_map(); win.destroy()
 
+        loc_ent.bind("<FocusOut>", lambda *_: geo.prefetch(loc_ent.get().strip(), e.location, win))
+        geo.cancel_with(win)
         ttk.Button(win, text="Zapisz", command=_save).grid(row=4, columnspan=2, pady=6)
 
     # ── CRUD dostawców ────────────────────────────────
@@ -327,30 +283,23 @@ def launch_main_app() -> None:
         n, cat, loc = sup_name_ent.get().strip(), sup_cat_ent.get().strip(), sup_loc_ent.get().strip()
         if not n or not cat or not loc:
             return
-        idx = sup_assign_cmb.current() - 1
-        st = stores[idx] if idx >= 0 else None
-        s = Supplier(n, cat, loc, st)
-        suppliers.append(s)
-        if st: st.suppliers.append(s)
+        s = Supplier(n, cat, loc, repo.store_by_label(sup_assign_cmb.get()), resolve=False)
+        repo.add(s)
+        geo.locate(s, loc, lambda: (refresh_sup_lb(), refresh_map()), lookup=wikigeocode)
         for w in (sup_name_ent, sup_cat_ent, sup_loc_ent): w.delete(0, tk.END)
         sup_assign_cmb.set("(brak)"); refresh_sup_lb(); refresh_map()
 
     def del_sup():
-        if not supplier_lb.curselection():
+        s = selected(supplier_lb, sup_rows)
+        if s is None:
             return
-        flt, idx = sup_filter_cmb.get(), supplier_lb.curselection()[0]
-        s = suppliers.pop(idx) if flt == "– Wszystkie –" else (
-            next(st for st in stores if str(st) == flt).suppliers.pop(idx))
-        if s.marker: s.marker.delete()
-        if s in suppliers: suppliers.remove(s)
+        geo.cancel_owner(s); repo.remove(s)
         refresh_sup_lb(); refresh_map()
 
     def edit_sup():
-        if not supplier_lb.curselection():
+        s = selected(supplier_lb, sup_rows)
+        if s is None:
             return
-        flt, idx = sup_filter_cmb.get(), supplier_lb.curselection()[0]
-        s = suppliers[idx] if flt == "– Wszystkie –" else (
-            next(st for st in stores if str(st) == flt).suppliers[idx])
 
         win = tk.Toplevel(app); win.title("Edytuj dostawcę")
         for i, (lbl, val) in enumerate([("Nazwa:", s.name),
@@ -362,21 +311,22 @@ def launch_main_app() -> None:
             elif i == 1: cat_ent = ent
             else: loc_ent = ent
         ttk.Label(win, text="Sklep:").grid(row=3, column=0, sticky="e")
-        cmb = ttk.Combobox(win, width=28, state="readonly", values=["(brak)"] + [str(st) for st in stores])
+        cmb = ttk.Combobox(win, width=28, state="readonly", values=["(brak)"] + [str(st) for st in stores.values()])
         cmb.grid(row=3, column=1); cmb.set(str(s.store) if s.store else "(brak)")
 
         def _save():
             s.name, s.category = name_ent.get().strip(), cat_ent.get().strip()
             new_loc = loc_ent.get().strip()
-            new_store = stores[cmb.current() - 1] if cmb.current() > 0 else None
-            if s.store is not new_store:
-                if s.store: s.store.suppliers.remove(s)
-                if new_store: new_store.suppliers.append(s)
-                s.store = new_store
+            repo.assign(s, repo.store_by_label(cmb.get()))
             if new_loc != s.location:
-                s.location = new_loc; s.lat, s.lon = wikigeocode(new_loc)
+                s.location = new_loc
+                geo.cancel_owner(s)
+                geo.locate(s, new_loc, lambda: (refresh_sup_lb(), refresh_map()), lookup=wikigeocode)
+            repo.update(s)
             refresh_sup_lb(); refresh_map(); win.destroy()
 
+        loc_ent.bind("<FocusOut>", lambda *_: geo.prefetch(loc_ent.get().strip(), s.location, win))
+        geo.cancel_with(win)
         ttk.Button(win, text="Zapisz", command=_save).grid(row=4, columnspan=2, pady=6)
 
     # ─────────  GUI  ─────────
@@ -447,6 +397,7 @@ def launch_main_app() -> None:
                                         "Dostawcy – wybrany sklep"])
     map_view_cmb.grid(row=0, column=1); map_view_cmb.current(0)
     map_view_cmb.bind("<<ComboboxSelected>>", refresh_map)
+    route_lbl = ttk.Label(top_m, text=""); route_lbl.grid(row=0, column=2, padx=8)
     map_w = tkintermapview.TkinterMapView(tab_m, width=1180, height=520, corner_radius=0)
     map_w.pack(); map_w.set_position(*PL_CENTER); map_w.set_zoom(6)
 
@@ -455,9 +406,15 @@ def launch_main_app() -> None:
     for lb, func in [(store_lb, edit_store), (employee_lb, edit_emp), (supplier_lb, edit_sup)]:
         lb.bind("<Double-1>", lambda e, f=func: f())
 
+    repo.events.subscribe(move_markers, kinds=("store",))
+
     sync_store_combos()
     refresh_store_lb(); refresh_emp_lb(); refresh_sup_lb(); refresh_map()
+
+    startup = [lambda: verify_presets(geo, repo, PRESET_STORES)] if VERIFY_PRESETS else []
+    after_first_window(app, t_start, *startup)
     app.mainloop()
+    route_planner.shutdown(); geo.close()
 
 # ─────────  OKNO LOGOWANIA  ─────────
 if __name__ == "__main__":
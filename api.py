@@ -0,0 +1,273 @@
+"""Lokalne API HTTP/JSON (tylko odczyt) nad siecią sklepów.
+
+Uruchomienie::
+
+    python api.py [--db siec.sqlite3] [--host 127.0.0.1] [--port 8080]
+
+Punkty końcowe (listy stronicowane ``offset``/``limit``)::
+
+    GET /stores     ?bbox=&offset=&limit=
+    GET /employees  ?store=&bbox=&offset=&limit=
+    GET /suppliers  ?store=&category=&bbox=&offset=&limit=
+    GET /stores/<id>, /employees/<id>, /suppliers/<id>
+
+``bbox`` = ``min_lon,min_lat,max_lon,max_lat`` (kolejność jak w GeoJSON).
+Odpowiedzi mają ``ETag``; ``If-None-Match`` z aktualnym znacznikiem daje
+304 bez treści. Dane serwowane są z indeksu w pamięci, a gotowe odpowiedzi
+z pamięci podręcznej – baza jest czytana tylko przy przeładowaniu, gdy
+inna aplikacja coś w niej zapisze (``PRAGMA data_version``).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import zlib
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+from spatial import GridIndex, mercator
+from storage import COLUMNS, DB_PATH, Storage
+
+HOST, PORT = "127.0.0.1", 8080
+PAGE_LIMIT = 100                # domyślna wielkość strony
+MAX_LIMIT = 1000
+RESPONSE_CACHE = 4096           # tyle gotowych odpowiedzi (ciało + ETag) trzymamy w pamięci
+RELOAD_S = 2.0                  # co tyle sprawdzamy, czy baza się zmieniła
+
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _error(message: str) -> bytes:
+    return json.dumps({"error": message}, ensure_ascii=False).encode()
+
+
+class NetworkIndex:
+    """Migawka bazy do serwowania: rekordy (słowniki gotowe do JSON) po id,
+    listy id per sklep i kategoria oraz GridIndex dla zapytań ``bbox``.
+
+    ``load`` buduje nowe struktury i podmienia je naraz, zwiększając ``version``.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.rows: dict[str, dict[int, dict]] = {t: {} for t in COLUMNS}
+        self.by_store: dict[str, dict[int, list[int]]] = {}
+        self.by_category: dict[str, list[int]] = {}
+        self.grids: dict[str, GridIndex] = {}
+
+    def load(self, db: Storage) -> None:
+        rows, by_store, by_category, grids = {}, {}, {}, {}
+        for table, cols in COLUMNS.items():
+            recs = rows[table] = {}
+            grid = grids[table] = GridIndex()
+            members = by_store[table] = {}
+            for row in db.rows(table):
+                rec = dict(zip(("id", *cols), row))
+                recs[rec["id"]] = rec
+                if rec["lat"] is not None:
+                    grid.add(rec["id"], rec["lat"], rec["lon"])
+                if rec.get("store_id") is not None:
+                    members.setdefault(rec["store_id"], []).append(rec["id"])
+                if table == "suppliers":
+                    by_category.setdefault(rec["category"], []).append(rec["id"])
+        self.rows, self.by_store, self.by_category, self.grids = rows, by_store, by_category, grids
+        self.version += 1
+
+    def select(self, table: str, store: int | None = None, category: str | None = None,
+               bbox: tuple[float, float, float, float] | None = None) -> list[int]:
+        "id pasujących rekordów, rosnąco"
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            x0, y0 = mercator(max_lat, min_lon)
+            x1, y1 = mercator(min_lat, max_lon)
+            ids = sorted(key for key, _, _ in self.grids[table].query((x0, y0, x1, y1)))
+        elif store is not None:
+            ids = self.by_store[table].get(store, [])
+            store = None
+        elif category is not None:
+            ids = self.by_category.get(category, [])
+            category = None
+        else:
+            return list(self.rows[table])
+        recs = self.rows[table]
+        if store is not None:
+            ids = [i for i in ids if recs[i]["store_id"] == store]
+        if category is not None:
+            ids = [i for i in ids if recs[i]["category"] == category]
+        return ids
+
+
+def _int(params: dict, name: str, default: int | None = None, low: int = 0, high: int | None = None) -> int | None:
+    if name not in params:
+        return default
+    try:
+        value = int(params[name][-1])
+    except ValueError:
+        raise BadRequest(f"{name}: oczekiwano liczby całkowitej") from None
+    if value < low or (high is not None and value > high):
+        raise BadRequest(f"{name}: poza zakresem")
+    return value
+
+
+def _bbox(params: dict) -> tuple[float, float, float, float] | None:
+    if "bbox" not in params:
+        return None
+    try:
+        box = tuple(float(v) for v in params["bbox"][-1].split(","))
+    except ValueError:
+        box = ()
+    if len(box) != 4 or box[0] > box[2] or box[1] > box[3]:
+        raise BadRequest("bbox: oczekiwano min_lon,min_lat,max_lon,max_lat")
+    return box
+
+
+class ApiServer:
+    """HTTP/1.1 na ``asyncio`` (keep-alive, GET/HEAD) nad ``NetworkIndex``."""
+
+    def __init__(self, index: NetworkIndex, db: Storage | None = None):
+        self.index, self.db = index, db
+        self._cache: OrderedDict[str, tuple[int, bytes, str]] = OrderedDict()
+        self._cache_version = index.version
+        self.requests = 0
+
+    # ── odpowiedzi ─────────────────────────────────────
+    def respond(self, target: str) -> tuple[int, bytes, str | None]:
+        "(status, ciało JSON, ETag) – udane odpowiedzi z pamięci podręcznej"
+        if self._cache_version != self.index.version:
+            self._cache.clear(); self._cache_version = self.index.version
+        hit = self._cache.get(target)
+        if hit is not None:
+            self._cache.move_to_end(target)
+            return hit
+        try:
+            status, payload = self._route(target)
+        except BadRequest as exc:
+            status, payload = 400, {"error": str(exc)}
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+        if status != 200:
+            return status, body, None
+        # z samej treści – po przeładowaniu bazy niezmieniona odpowiedź dalej daje 304
+        etag = f'"{len(body):x}-{zlib.crc32(body):08x}"'
+        self._cache[target] = (status, body, etag)
+        if len(self._cache) > RESPONSE_CACHE:
+            self._cache.popitem(last=False)
+        return status, body, etag
+
+    def _route(self, target: str) -> tuple[int, object]:
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        if not parts or parts[0] not in COLUMNS or len(parts) > 2:
+            return 404, {"error": "nie ma takiego zasobu"}
+        table = parts[0]
+        if len(parts) == 2:
+            try:
+                rec = self.index.rows[table].get(int(parts[1]))
+            except ValueError:
+                rec = None
+            return (200, rec) if rec is not None else (404, {"error": "nie ma takiego rekordu"})
+        params = parse_qs(url.query)
+        offset = _int(params, "offset", 0)
+        limit = _int(params, "limit", PAGE_LIMIT, 1, MAX_LIMIT)
+        store = _int(params, "store") if table != "stores" else None
+        category = params["category"][-1] if table == "suppliers" and "category" in params else None
+        ids = self.index.select(table, store, category, _bbox(params))
+        recs = self.index.rows[table]
+        return 200, {"total": len(ids), "offset": offset, "limit": limit,
+                     "items": [recs[i] for i in ids[offset:offset + limit]]}
+
+    # ── połączenia ─────────────────────────────────────
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                headers = {}
+                while (h := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = h.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if "content-length" in headers:
+                    await reader.readexactly(int(headers["content-length"]))
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    self._write(writer, 400, _error("zły wiersz żądania"), None, False, False)
+                    break
+                keep = (headers.get("connection", "").lower() != "close" if version == "HTTP/1.1"
+                        else headers.get("connection", "").lower() == "keep-alive")
+                self.requests += 1
+                if method not in ("GET", "HEAD"):
+                    status, body, etag = 405, _error("tylko GET i HEAD"), None
+                else:
+                    status, body, etag = self.respond(target)
+                    match = headers.get("if-none-match")
+                    if etag and match and (match == "*" or etag in (t.strip() for t in match.split(","))):
+                        status, body = 304, b""
+                self._write(writer, status, body, etag, keep, method == "HEAD")
+                await writer.drain()
+                if not keep:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write(writer, status: int, body: bytes, etag: str | None, keep: bool, head: bool) -> None:
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}",
+                 "Content-Type: application/json; charset=utf-8",
+                 f"Content-Length: {len(body)}",
+                 "Connection: keep-alive" if keep else "Connection: close"]
+        if etag:
+            lines.append(f"ETag: {etag}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (b"" if head else body))
+
+    async def watch(self) -> None:
+        "przeładowanie indeksu, gdy inne połączenie zmieni bazę"
+        if self.db is None:
+            return
+        seen = self.db.data_version()
+        while True:
+            await asyncio.sleep(RELOAD_S)
+            now = self.db.data_version()
+            if now != seen:
+                seen = now
+                self.index.load(self.db)
+
+
+async def serve(db_path: str = DB_PATH, host: str = HOST, port: int = PORT) -> None:
+    db = Storage(db_path)
+    index = NetworkIndex()
+    index.load(db)
+    api = ApiServer(index, db)
+    server = await asyncio.start_server(api.handle, host, port, backlog=1024)
+    print(f"API: http://{host}:{port}/ – sklepów {len(index.rows['stores'])}, "
+          f"pracowników {len(index.rows['employees'])}, dostawców {len(index.rows['suppliers'])}", flush=True)
+    watcher = asyncio.create_task(api.watch())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+        db.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    args = ap.parse_args()
+    try:
+        asyncio.run(serve(args.db, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
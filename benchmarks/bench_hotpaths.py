@@ -0,0 +1,341 @@
+"""Benchmarki gorących ścieżek: CRUD, odświeżanie list i mapy, geokodowanie.
+
+Uruchomienie (z katalogu repozytorium)::
+
+    python benchmarks/bench_hotpaths.py [--sizes 1000,10000,100000] [--latency-ms 20]
+    python benchmarks/bench_hotpaths.py --save-baseline            # zapis punktu odniesienia
+    python benchmarks/bench_hotpaths.py --threshold 0.25           # porównanie z nim
+
+Nominatim i Wikipedia są zastąpione lokalnym serwerem HTTP z opóźnieniem
+``--latency-ms``, mapa – atrapą TkinterMapView (MarkerManager liczy markery
+jak w aplikacji, ale niczego nie rysuje), baza i geocache – plikami
+tymczasowymi. Odpowiedniki ścieżek z aplikacji:
+
+* ``construct`` / ``construct_supplier`` – Employee/Supplier z geokodowaniem; miejscowości
+  spoza gazetteera (``n/100``, najwyżej ``--geo-queries`` różnych, w każdej rundzie nowe),
+  więc idą do zaślepki Wikipedii,
+* ``construct_store`` – Store.raw ze współrzędnymi (sam układ modelu, bez Nominatim),
+* ``add`` – zapis nowych encji (Repository + Storage),
+* ``refresh_emp_lb`` / ``refresh_emp_lb_query`` – przebudowa listy (VirtualList.set_rows
+  z wynikiem wyszukiwania) bez i z zapytaniem,
+* ``patch_emp_lb`` – poprawka listy z partii zmian (VirtualList.apply; po 1% dodanych,
+  zmienionych i usuniętych),
+* ``refresh_map`` / ``refresh_map_pan`` – klastry i markery od zera / po przesunięciu 1% punktów,
+* ``del_store`` – usunięcie sklepu z pracownikami i dostawcami,
+* ``geocode_cold`` / ``geocode_warm`` / ``wikigeocode_cold`` – partia zapytań przez pulę.
+
+Wynik (sekundy, najlepszy z ``--repeat``) trafia do ``--out`` (JSON). Jeśli
+istnieje ``--baseline``, pomiar wolniejszy o więcej niż ``--threshold``
+(i o więcej niż ``--min-ms``) to regresja – kod wyjścia 1.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+RESULTS = os.path.join(ROOT, "benchmarks", "results")
+
+TMP = tempfile.mkdtemp(prefix="bench_hotpaths_")
+os.environ["SIEC_GEOCACHE"] = os.path.join(TMP, "geocache.sqlite3")   # przed importem core
+
+import core  # noqa: E402
+from events import ADDED, REMOVED, UPDATED, Change  # noqa: E402
+from geoservice import GeocodeService  # noqa: E402
+from httpclient import geo_http  # noqa: E402
+from listview import VirtualList  # noqa: E402
+from markers import MarkerManager  # noqa: E402
+from repository import Repository  # noqa: E402
+from spatial import ClusterIndex, mercator  # noqa: E402
+from storage import Storage  # noqa: E402
+
+POLAND = (*mercator(54.9, 14.1), *mercator(49.0, 24.2))     # widok mapy na cały kraj
+ZOOM = 6
+
+
+# ── zaślepki dostawców ─────────────────────────────────
+def _coords(text: str) -> tuple[float, float]:
+    h = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big")
+    return 49.2 + (h % 10_000) / 10_000 * 5.4, 14.3 + (h // 10_000 % 10_000) / 10_000 * 9.6
+
+
+class StubProviders(BaseHTTPRequestHandler):
+    "/search?q= jak Nominatim, /wiki/<tytuł> jak artykuł pl.wikipedii"
+    latency_s = 0.0
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True      # nagłówki i treść idą osobno – bez tego +40 ms (opóźniony ACK)
+
+    def do_GET(self):
+        time.sleep(self.latency_s)
+        url = urlsplit(self.path)
+        if url.path == "/search":
+            lat, lon = _coords(parse_qs(url.query)["q"][0])
+            body = json.dumps([{"lat": str(lat), "lon": str(lon)}]).encode()
+            ctype = "application/json"
+        else:
+            lat, lon = _coords(unquote(url.path.rsplit("/", 1)[-1]))
+            spans = (f'<span class="latitude">{int(lat)}°N</span><span class="longitude">{int(lon)}°E</span>'
+                     f'<span class="latitude">{lat:.6f}</span><span class="longitude">{lon:.6f}</span>')
+            body = f"<html><body>{spans}{'<p>treść</p>' * 2000}</body></html>".encode()
+            ctype = "text/html"
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # extract_coords kończy czytanie artykułu wcześniej i zrywa połączenie – to nie błąd
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_stubs(latency_ms: float) -> ThreadingHTTPServer:
+    StubProviders.latency_s = latency_ms / 1000
+    server = StubServer(("127.0.0.1", 0), StubProviders)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    core.NOMINATIM_URL, core.WIKI_URL = base + "/search", base + "/wiki/"
+    geo_http.limits["127.0.0.1"] = (1e9, 1_000_000)          # bez limitu – to nie prawdziwy Nominatim
+    return server
+
+
+# ── atrapa mapy ────────────────────────────────────────
+class FakeMarker:
+    def __init__(self, lat, lon, text):
+        self.position, self.text = (lat, lon), text
+        self.polygon = self.big_circle = self.canvas_text = self.canvas_icon = self.canvas_image = 1
+        self.deleted = False
+
+    def draw(self):
+        pass
+
+
+class FakeCanvas:
+    def delete(self, item):
+        pass
+
+
+class FakeMap:
+    "tyle z TkinterMapView, ile używa MarkerManager"
+    def __init__(self):
+        self.canvas, self.canvas_marker_list = FakeCanvas(), []
+
+    def set_marker(self, lat, lon, text="", **_):
+        marker = FakeMarker(lat, lon, text)
+        self.canvas_marker_list.append(marker)
+        return marker
+
+
+class FakeTree:
+    "tyle z ttk.Treeview i Scrollbar, ile używa VirtualList"
+    def item(self, iid, text=""):
+        pass
+
+    def selection_set(self, items):
+        pass
+
+    def set(self, first, last):
+        pass
+
+
+def fake_list(label, height: int = 12) -> VirtualList:
+    "VirtualList bez okna – te same metody danych i rysowania, atrapa zamiast widgetów"
+    lb = VirtualList.__new__(VirtualList)
+    lb.label, lb.height = label, height
+    lb.ids, lb._members, lb.top, lb.selected, lb._on_select = [], set(), 0, None, []
+    lb.tree = lb.scroll = FakeTree()
+    lb._pool = list(range(height))
+    return lb
+
+
+# ── dane ───────────────────────────────────────────────
+def network(n: int, rnd: random.Random):
+    "sklepy (n/100, min. 10) i po n pracowników i dostawców, bez geokodowania"
+    stores = [core.Store.raw(f"Sklep {i}", f"Miasto {i}, Ulica {i}", *_coords(f"s{i}")) for i in range(max(10, n // 100))]
+    emps = [core.Employee.raw(f"Pracownik {i}", "kasjer", "Warszawa", rnd.choice(stores), *_coords(f"e{i}"))
+            for i in range(n)]
+    sups = [core.Supplier.raw(f"Dostawca {i}", "nabiał", "Kraków", rnd.choice(stores), *_coords(f"d{i}"))
+            for i in range(n)]
+    return stores, emps, sups
+
+
+def timed(fn, repeat: int, setup=None) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        t = time.perf_counter()
+        fn(arg) if setup else fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+# ── pomiary ────────────────────────────────────────────
+def bench_size(n: int, repeat: int, geo_queries: int) -> dict[str, float]:
+    rnd = random.Random(n)
+    out = {}
+
+    # miejscowości, których nie ma w gazetteerze – z nowym sufiksem w każdej rundzie (zimny cache)
+    unique = min(geo_queries, max(1, n // 100))
+    picks = [rnd.randrange(unique) for _ in range(n)]
+    rounds = itertools.count()
+
+    def fresh_locs():
+        r = next(rounds)
+        return [f"Osada {k} #{n}-{r}" for k in range(unique)]
+    out["construct"] = timed(lambda locs: [core.Employee(f"P {i}", "kasjer", locs[k]) for i, k in enumerate(picks)],
+                             repeat, fresh_locs)
+    out["construct_supplier"] = timed(lambda locs: [core.Supplier(f"D {i}", "nabiał", locs[k])
+                                                    for i, k in enumerate(picks)], repeat, fresh_locs)
+    points = [_coords(f"s{i}") for i in range(n)]
+    out["construct_store"] = timed(lambda: [core.Store.raw(f"S {i}", f"Adres {i}", lat, lon)
+                                            for i, (lat, lon) in enumerate(points)], repeat)
+
+    def fresh_repo(_=None):
+        path = os.path.join(TMP, f"siec_{n}_{rnd.random()}.sqlite3")
+        return Repository(Storage(path)), network(n, rnd)
+
+    def add(arg):
+        repo, (stores, emps, sups) = arg
+        repo.add_many(stores); repo.add_many(emps); repo.add_many(sups)
+    out["add"] = timed(add, repeat, fresh_repo)
+
+    repo, (stores, emps, sups) = fresh_repo()
+    add((repo, (stores, emps, sups)))
+    employee_lb = fake_list(lambda i: str(repo.employees[i]))
+    out["refresh_emp_lb"] = timed(lambda: employee_lb.set_rows(repo.search("employee", "", None)), repeat)
+    repo.search("employee", "prac")                                    # budowa indeksu poza pomiarem
+    out["refresh_emp_lb_query"] = timed(
+        lambda: employee_lb.set_rows(repo.search("employee", "pracownik 1", None)), repeat)
+
+    def patch_batch():
+        "lista pełna, do tego partia zmian jak z repo.events"
+        employee_lb.set_rows(repo.employees)
+        k = max(1, n // 100)
+        extra = [core.Employee.raw(f"Nowy {i}", "kasjer", "Warszawa", None, *_coords(f"n{i}")) for i in range(k)]
+        repo.add_many(extra, persist=False)
+        return ([Change(ADDED, e) for e in extra]
+                + [Change(UPDATED, e) for e in rnd.sample(emps, k)]
+                + [Change(REMOVED, e) for e in rnd.sample(emps, k)])
+    out["patch_emp_lb"] = timed(lambda changes: employee_lb.apply(changes, lambda e: True), repeat, patch_batch)
+
+    def map_refresh(state):
+        idx, markers = state
+        idx.sync((e, e.lat, e.lon) for e in repo.employees.values())
+        markers.sync((key, lat, lon, key.fullname, "orange") if count == 1 else (cell, lat, lon, str(count), "darkorange3")
+                     for key, lat, lon, count, cell in idx.clusters(ZOOM, POLAND))
+    out["refresh_map"] = timed(map_refresh, repeat, lambda: (ClusterIndex(), MarkerManager(FakeMap())))
+
+    def moved_state():
+        state = (ClusterIndex(), MarkerManager(FakeMap()))
+        map_refresh(state)
+        for e in rnd.sample(emps, max(1, n // 100)):
+            e.lat, e.lon = _coords(f"{e.fullname}-{rnd.random()}")
+        return state
+    out["refresh_map_pan"] = timed(map_refresh, repeat, moved_state)
+
+    victims = iter(list(repo.stores.values()))
+    out["del_store"] = timed(lambda st: repo.remove(st), min(repeat, len(repo.stores)), lambda: next(victims))
+    repo.storage.close()
+    return out
+
+
+def bench_geocoding(queries: int, repeat: int) -> dict[str, float]:
+    service = GeocodeService(workers=8)
+    unknown = [f"Wieś {i}, ulica {i}" for i in range(queries)]
+    out = {}
+
+    def batch(fn, qs):
+        for fut in service.submit_many(fn.__name__, fn, qs, peek=None).values():
+            fut.result()
+
+    # cold: za każdym razem inne zapytania, żeby nie trafiać w cache
+    rounds = iter(range(repeat))
+    out["geocode_cold"] = timed(lambda r: batch(core.locate, [f"{q} #{r}" for q in unknown]), repeat,
+                                lambda: next(rounds))
+    out["geocode_warm"] = timed(lambda: batch(core.locate, [f"{q} #0" for q in unknown]), repeat)
+    rounds = iter(range(repeat))
+    out["wikigeocode_cold"] = timed(lambda r: batch(core.wikigeocode, [f"Wieś {i} {r}" for i in range(queries)]),
+                                    repeat, lambda: next(rounds))
+    service.shutdown()
+    return out
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float, min_s: float) -> list[str]:
+    worse = []
+    for key, now in results.items():
+        was = baseline.get(key)
+        if was and now > was * (1 + threshold) and now - was > min_s:
+            worse.append(f"{key}: {was * 1000:.2f} → {now * 1000:.2f} ms (+{now / was - 1:.0%})")
+    return worse
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="opóźnienie zaślepek Nominatim/Wikipedii")
+    ap.add_argument("--geo-queries", type=int, default=200)
+    ap.add_argument("--out", default=os.path.join(RESULTS, "latest.json"))
+    ap.add_argument("--baseline", default=os.path.join(RESULTS, "baseline.json"))
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--threshold", type=float, default=0.25, help="dopuszczalne spowolnienie (0.25 = 25%%)")
+    ap.add_argument("--min-ms", type=float, default=2.0, help="różnice poniżej tego to szum")
+    args = ap.parse_args()
+
+    stubs = start_stubs(args.latency_ms)
+    results: dict[str, float] = {}
+    for n in (int(s) for s in args.sizes.split(",")):
+        for key, value in bench_size(n, args.repeat, args.geo_queries).items():
+            results[f"{key}/{n}"] = value
+            print(f"{key + '/' + str(n):28} {value * 1000:10.2f} ms", flush=True)
+    for key, value in bench_geocoding(args.geo_queries, args.repeat).items():
+        results[f"{key}/{args.geo_queries}"] = value
+        print(f"{key + '/' + str(args.geo_queries):28} {value * 1000:10.2f} ms", flush=True)
+    stubs.shutdown()
+    geo_http.close()
+    shutil.rmtree(TMP, ignore_errors=True)
+
+    report = {"meta": {"python": platform.python_version(), "machine": platform.machine(),
+                       "latency_ms": args.latency_ms, "repeat": args.repeat,
+                       "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+              "results": results}
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"zapisano punkt odniesienia: {args.baseline}")
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as fh:
+            worse = compare(results, json.load(fh)["results"], args.threshold, args.min_ms / 1000)
+        if worse:
+            print("REGRESJA:\n  " + "\n  ".join(worse))
+            sys.exit(1)
+        print(f"bez regresji względem {args.baseline} (próg {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Porównanie: pełny parse BeautifulSoup vs wikicoords.extract_coords.
+
+Uruchomienie (z katalogu repozytorium)::
+
+    python benchmarks/bench_wikicoords.py [--size-kb 400] [--repeat 20]
+
+Fixtures to zapisane strony pl.wikipedii (``fixtures/*.html``); treść
+artykułu jest powielana w miejscu ``<!-- ARTICLE-BODY -->`` do zadanego
+rozmiaru, żeby odpowiadała typowemu artykułowi o mieście (300–600 KB).
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wikicoords import CHUNK, extract_coords  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FILLER = ('<p>Zabudowa <a href="/wiki/Śródmieście" title="Śródmieście">Śródmieścia</a> '
+          'powstała w większości po <a href="/wiki/II_wojna_światowa">II wojnie światowej</a>.'
+          '<sup class="reference"><a href="#cite_note-3">[3]</a></sup></p>\n')
+
+
+def page(path: str, size_kb: int) -> bytes:
+    html = open(path, encoding="utf-8").read()
+    missing = size_kb * 1024 - len(html.encode())
+    if missing > 0 and "<!-- ARTICLE-BODY -->" in html:
+        html = html.replace("<!-- ARTICLE-BODY -->", FILLER * (missing // len(FILLER.encode()) + 1))
+    return html.encode()
+
+
+def soup_coords(data: bytes):
+    "dotychczasowa implementacja (cały dokument przez html.parser)"
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(data.decode(), "html.parser")
+    lat, lon = soup.select(".latitude"), soup.select(".longitude")
+    if len(lat) < 2 or len(lon) < 2:
+        return None
+    return float(lat[1].text.replace(",", ".")), float(lon[1].text.replace(",", "."))
+
+
+def chunked(data: bytes, read: list[int]):
+    for i in range(0, len(data), CHUNK):
+        read[0] += min(CHUNK, len(data) - i)
+        yield data[i:i + CHUNK]
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size-kb", type=int, default=400)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    try:
+        import bs4  # noqa: F401
+        have_bs4 = True
+    except ImportError:
+        have_bs4 = False
+        print("bs4 niezainstalowane – pomijam pomiar bazowy")
+
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.html"))):
+        data = page(path, args.size_kb)
+        read = [0]
+        coords = extract_coords(chunked(data, read))
+        fast = timed(lambda: extract_coords(chunked(data, [0])), args.repeat)
+        line = (f"{os.path.basename(path)}: {len(data) / 1024:.0f} KB, wynik {coords}, "
+                f"extract_coords {fast * 1000:.3f} ms (przeczytane {read[0] / 1024:.0f} KB)")
+        if have_bs4:
+            assert soup_coords(data) == coords, "różne wyniki parserów"
+            slow = timed(lambda: soup_coords(data), max(1, args.repeat // 4))
+            line += f", BeautifulSoup {slow * 1000:.1f} ms, przyspieszenie ×{slow / fast:.0f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Test obciążenia api.py: równoległe połączenia keep-alive, żądania przez zadany czas.
+
+Uruchomienie (z katalogu repozytorium)::
+
+    python benchmarks/load_api.py --seed 100000          # baza syntetyczna + serwer w podprocesie
+    python benchmarks/load_api.py --url http://127.0.0.1:8080 [--etag]
+
+``--seed N`` tworzy tymczasową bazę z N pracownikami i N dostawcami (100
+sklepów w Polsce) i uruchamia na niej ``api.py``. ``--etag`` wysyła
+``If-None-Match`` z poprzedniej odpowiedzi (ścieżka 304). Wynik: żądania/s
+i opóźnienia p50/p95/p99.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PATHS = [
+    "/stores",
+    "/employees?limit=50",
+    "/employees?store={store}",
+    "/suppliers?category={category}&offset=100",
+    "/suppliers?bbox=20.5,52.0,21.5,52.5",
+    "/employees/{entity}",
+]
+CATEGORIES = ["nabiał", "pieczywo", "warzywa", "mięso", "napoje"]
+
+
+def seed(path: str, n: int) -> None:
+    from storage import Storage
+    rnd = random.Random(1)
+    db = Storage(path)
+    rows = lambda: (rnd.uniform(49.2, 54.6), rnd.uniform(14.3, 23.9))   # noqa: E731
+    with db._db:
+        db._db.executemany("INSERT INTO stores (name, address, lat, lon) VALUES (?, ?, ?, ?)",
+                           ((f"Sklep {i}", f"Adres {i}", *rows()) for i in range(100)))
+        db._db.executemany(
+            "INSERT INTO employees (fullname, position, location, store_id, lat, lon) VALUES (?, ?, ?, ?, ?, ?)",
+            ((f"Pracownik {i}", "kasjer", "Warszawa", rnd.randint(1, 100), *rows()) for i in range(n)))
+        db._db.executemany(
+            "INSERT INTO suppliers (name, category, location, store_id, lat, lon) VALUES (?, ?, ?, ?, ?, ?)",
+            ((f"Dostawca {i}", rnd.choice(CATEGORIES), "Kraków", rnd.randint(1, 100), *rows()) for i in range(n)))
+    db.close()
+
+
+async def worker(host: str, port: int, deadline: float, etag: bool, lat: list[float], rnd: random.Random) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    tags: dict[str, str] = {}
+    while time.perf_counter() < deadline:
+        path = rnd.choice(PATHS).format(store=rnd.randint(1, 100), category=rnd.choice(CATEGORIES),
+                                        entity=rnd.randint(1, 1000))
+        extra = f"If-None-Match: {tags[path]}\r\n" if etag and path in tags else ""
+        t = time.perf_counter()
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n{extra}\r\n".encode())
+        status = await reader.readline()
+        length, tag = 0, None
+        while (line := await reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+            elif name.lower() == "etag":
+                tag = value.strip()
+        await reader.readexactly(length)
+        lat.append(time.perf_counter() - t)
+        if not status.startswith((b"HTTP/1.1 200", b"HTTP/1.1 304")):
+            raise RuntimeError(f"{path}: {status!r}")
+        if tag:
+            tags[path] = tag
+    writer.close()
+
+
+async def run(url: str, connections: int, duration: float, etag: bool) -> list[float]:
+    parts = urlsplit(url)
+    deadline = time.perf_counter() + duration
+    lat: list[float] = []
+    await asyncio.gather(*(worker(parts.hostname, parts.port or 80, deadline, etag, lat, random.Random(i))
+                           for i in range(connections)))
+    return lat
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://127.0.0.1:8080")
+    ap.add_argument("--seed", type=int, default=0, help="baza syntetyczna z N pracownikami/dostawcami")
+    ap.add_argument("--connections", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=5.0)
+    ap.add_argument("--etag", action="store_true", help="If-None-Match z poprzedniej odpowiedzi")
+    args = ap.parse_args()
+
+    server = tmp = None
+    if args.seed:
+        tmp = tempfile.mkdtemp()
+        db_path = os.path.join(tmp, "siec.sqlite3")
+        seed(db_path, args.seed)
+        port = urlsplit(args.url).port or 8080
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "api.py"), "--db", db_path,
+                                   "--port", str(port)], stdout=subprocess.PIPE, text=True)
+        print(server.stdout.readline().strip())
+    try:
+        lat = asyncio.run(run(args.url, args.connections, args.duration, args.etag))
+    finally:
+        if server is not None:
+            server.terminate(); server.wait()
+    lat.sort()
+    pct = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))] * 1000   # noqa: E731
+    print(f"{len(lat)} żądań w {args.duration:g} s = {len(lat) / args.duration:.0f}/s "
+          f"({args.connections} połączeń{', If-None-Match' if args.etag else ''}); "
+          f"p50 {pct(0.50):.2f} ms, p95 {pct(0.95):.2f} ms, p99 {pct(0.99):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""Rdzeń sieci sklepów bez interfejsu: modele, geokodowanie, wczytanie sieci.
+
+Nie importuje Tk ani ``tkintermapview``; ciężkie zależności (``requests``
+przez ``httpclient``, NumPy) ładowane są dopiero przy pierwszym użyciu,
+więc ``import core`` jest tani – nadaje się do skryptów wsadowych i usług
+na serwerach bez ekranu. Aplikacje okienkowe są nakładkami na ten moduł.
+"""
+from __future__ import annotations
+
+import os
+from array import array
+
+import metrics
+from geocache import DEFAULT_PATH, GeoCache
+from geocoders import Gazetteer, GeocoderChain, Provider
+from repository import Repository
+from storage import DB_PATH, Storage
+from wikicoords import CHUNK, extract_coords
+
+PL_CENTER = (52.2297, 21.0122)
+NAN = float("nan")
+
+# adresy dostawców – benchmarki podmieniają je na lokalne zaślepki
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+WIKI_URL = "https://pl.wikipedia.org/wiki/"
+
+# ─────────  GEOKODOWANIE  ─────────
+# plik cache otwierany dopiero przy pierwszym zapytaniu – sam import nie dotyka dysku
+geo_cache = GeoCache(os.environ.get("SIEC_GEOCACHE", DEFAULT_PATH))
+
+
+@geo_cache.cached("nominatim")
+def geocode(query: str) -> tuple[float, float] | None:
+    "dla OSM"
+    from httpclient import geo_http
+    data = geo_http.get_json(
+        NOMINATIM_URL,
+        params={"q": query, "format": "json", "limit": 1},
+        timeout=5
+    )
+    return (float(data[0]["lat"]), float(data[0]["lon"])) if data else None
+
+nominatim_geocode = metrics.timed("nominatim_geocode")(geocode)
+
+
+@geo_cache.cached("wikipedia")
+def _wiki_coords(city: str) -> tuple[float, float] | None:
+    "artykuł czytany paczkami tylko do bloku współrzędnych (wikicoords)"
+    from httpclient import geo_http
+    title = city.strip().replace(" ", "_")
+    with geo_http.get(WIKI_URL + title, timeout=6, stream=True) as resp:
+        return extract_coords(resp.iter_content(CHUNK))
+
+# łańcuchy źródeł dla pracowników i dostawców – miejscowości zwykle rozwiązuje
+# lokalny gazetteer, sieć tylko dla reszty; błędy źródeł nie trafiają do cache
+gazetteer = Gazetteer()
+nominatim = Provider("nominatim", nominatim_geocode)
+wikipedia = Provider("wikipedia", lambda q: _wiki_coords(q.split(",")[0]))
+locate_chain = GeocoderChain([gazetteer, nominatim, wikipedia], fallback=PL_CENTER)
+wiki_chain = GeocoderChain([gazetteer, wikipedia], fallback=PL_CENTER)
+
+@metrics.timed("wikigeocode")
+def wikigeocode(city: str) -> tuple[float, float]:
+    return wiki_chain(city)
+
+@metrics.timed("locate")
+def locate(location: str) -> tuple[float, float]:
+    "gazetteer, potem Nominatim, potem wiki"
+    return locate_chain(location)
+
+def _chain_stats(chain: GeocoderChain) -> dict:
+    return {name: {"calls": s.calls, "hit_rate": s.hit_rate, "errors": s.errors, "avg_ms": s.avg_ms}
+            for name, s in chain.stats().items()}
+
+metrics.source("geocache", geo_cache.stats)
+metrics.source("locate_chain", lambda: _chain_stats(locate_chain))
+metrics.source("wiki_chain", lambda: _chain_stats(wiki_chain))
+
+# ─────────  MODELE  ─────────
+# Encje mają __slots__, a współrzędne trzymają poza obiektem – w kolumnach
+# array('d') swojej klasy (wiersz ``_row``, NaN = brak). Marker nie jest już
+# atrybutem encji (trzyma go MarkerManager). Pracownik zajmuje ~137 B zamiast
+# ~200 B (bez napisów; Python 3.11, tracemalloc na 200 tys. encji) – przy
+# milionie to ~60 MB mniej – a kod przestrzenny czyta współrzędne hurtem
+# (``Coordinates.take``) zamiast atrybut po atrybucie.
+class Coordinates:
+    "lat/lon encji jednej klasy w dwóch ciągłych tablicach; zwolnione wiersze są używane ponownie"
+
+    def __init__(self):
+        self.lat, self.lon = array("d"), array("d")
+        self._free: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.lat) - len(self._free)
+
+    def alloc(self) -> int:
+        if self._free:
+            return self._free.pop()
+        self.lat.append(NAN); self.lon.append(NAN)
+        return len(self.lat) - 1
+
+    def release(self, row: int) -> None:
+        self.lat[row] = self.lon[row] = NAN
+        self._free.append(row)
+
+    def take(self, rows: list[int]):
+        "współrzędne wierszy naraz – tablica NumPy (n, 2), bez NumPy lista par"
+        try:
+            import numpy as np
+        except ImportError:
+            lat, lon = self.lat, self.lon
+            return [(lat[r], lon[r]) for r in rows]
+        # indeksowanie daje kopię, a chwilowy widok znika od razu – trwały
+        # widok blokowałby dopisywanie do array('d')
+        idx = np.asarray(rows, dtype=np.intp)
+        return np.column_stack((np.frombuffer(self.lat)[idx], np.frombuffer(self.lon)[idx]))
+
+
+class _Located:
+    "wspólna część encji: wiersz w ``coords`` klasy i lat/lon jako właściwości"
+    __slots__ = ("_row",)
+    coords: Coordinates
+
+    def __new__(cls, *args, **kwargs):
+        obj = super().__new__(cls)
+        obj._row = cls.coords.alloc()
+        return obj
+
+    def __del__(self):
+        try:
+            self.coords.release(self._row)
+        except (AttributeError, TypeError):     # zamykanie interpretera
+            pass
+
+    @property
+    def lat(self) -> float | None:
+        v = self.coords.lat[self._row]
+        return None if v != v else v
+
+    @lat.setter
+    def lat(self, value: float | None) -> None:
+        self.coords.lat[self._row] = NAN if value is None else value
+
+    @property
+    def lon(self) -> float | None:
+        v = self.coords.lon[self._row]
+        return None if v != v else v
+
+    @lon.setter
+    def lon(self, value: float | None) -> None:
+        self.coords.lon[self._row] = NAN if value is None else value
+
+    @property
+    def pending(self) -> bool:
+        return self.coords.lat[self._row] != self.coords.lat[self._row]
+
+
+class Store(_Located):
+    __slots__ = ("name", "address", "employees", "suppliers", "id")
+    kind = "store"
+    coords = Coordinates()
+
+    def __init__(self, name: str, address: str):
+        self.name, self.address = name, address
+        # słowniki encja → None: uporządkowany zbiór, usuwanie O(1)
+        self.employees: dict[Employee, None] = {}
+        self.suppliers: dict[Supplier, None] = {}
+        self.id = None
+        coords = nominatim_geocode(address)
+        if coords is None:
+            raise ValueError(f"Adres „{address}” nie znaleziony w OSM.")
+        self.lat, self.lon = coords
+
+    @classmethod
+    def raw(cls, name: str, address: str, lat: float, lon: float) -> "Store":
+        obj = cls.__new__(cls)
+        obj.name, obj.address = name, address
+        obj.lat, obj.lon = lat, lon
+        obj.employees, obj.suppliers, obj.id = {}, {}, None
+        return obj
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.address})"
+
+
+class Employee(_Located):
+    __slots__ = ("fullname", "position", "location", "store", "id")
+    kind = "employee"
+    coords = Coordinates()
+
+    def __init__(self,
+                 fullname: str,
+                 position: str,
+                 location: str,
+                 store: Store | None = None,
+                 resolve: bool = True):
+
+        self.fullname, self.position, self.location = fullname, position, location
+        self.store = store
+        self.id = None
+
+        # ➊ jeśli przypisany do sklepu → bierzemy współrzędne sklepu
+        if store is not None:
+            self.lat, self.lon = store.lat, store.lon
+        elif resolve:
+            # ➋ najpierw próbujemy Nominatim, potem fallback do wiki
+            self.latlon_from_location(location)
+        # ➌ inaczej lokalizacja w toku (NaN w kolumnie) – współrzędne dostarczy GeocodeService
+
+    @classmethod
+    def raw(cls, fullname: str, position: str, location: str,
+            store: Store | None, lat: float | None, lon: float | None) -> "Employee":
+        obj = cls(fullname, position, location, None, resolve=False)
+        obj.store, obj.lat, obj.lon = store, lat, lon
+        return obj
+
+    # pomocnicza metoda
+    def latlon_from_location(self, location: str) -> None:
+        self.lat, self.lon = locate(location)
+
+    def __str__(self):
+        tail = " – lokalizacja…" if self.pending else ""
+        return f"{self.fullname} – {self.position} ({self.location}){tail}"
+
+class Supplier(_Located):
+    __slots__ = ("name", "category", "location", "store", "id")
+    kind = "supplier"
+    coords = Coordinates()
+
+    def __init__(self,
+                 name: str,
+                 category: str,
+                 location: str,
+                 store: Store | None = None,
+                 resolve: bool = True):
+
+        self.name, self.category, self.location = name, category, location
+        self.store = store
+        self.id = None
+
+        if store is not None:
+            self.lat, self.lon = store.lat, store.lon
+        elif resolve:
+            self.latlon_from_location(location)
+
+    @classmethod
+    def raw(cls, name: str, category: str, location: str,
+            store: Store | None, lat: float | None, lon: float | None) -> "Supplier":
+        obj = cls(name, category, location, None, resolve=False)
+        obj.store, obj.lat, obj.lon = store, lat, lon
+        return obj
+
+    # ta sama pomocnicza metoda co wyżej
+    latlon_from_location = Employee.latlon_from_location
+
+    def __str__(self):
+        tail = " – lokalizacja…" if self.pending else ""
+        return f"{self.name} – {self.category} ({self.location}){tail}"
+
+# ─────────  SIEĆ  ─────────
+def load_network(db: Storage, repo: Repository) -> None:
+    "wczytanie zapisanej sieci – bez geokodowania, współrzędne z bazy"
+    by_id: dict[int, Store] = {}
+    for sid, name, address, lat, lon in db.rows("stores"):
+        st = Store.raw(name, address, lat, lon); st.id = sid
+        by_id[sid] = st
+    repo.add_many(by_id.values(), persist=False)
+    for cls, table in ((Employee, "employees"), (Supplier, "suppliers")):
+        batch = []
+        for eid, first, second, location, sid, lat, lon in db.rows(table):
+            ent = cls.raw(first, second, location, by_id.get(sid), lat, lon); ent.id = eid
+            batch.append(ent)
+        repo.add_many(batch, persist=False)
+
+
+def open_network(path: str = DB_PATH, presets=()) -> Repository:
+    "sieć z bazy (``repo.storage``); pusta baza dostaje sklepy ``presets`` (nazwa, adres, lat, lon)"
+    db = Storage(path)
+    repo = Repository(db)
+    if db.is_empty():
+        repo.add_many(Store.raw(n, a, lat, lon) for n, a, lat, lon in presets)
+    else:
+        load_network(db, repo)
+    return repo
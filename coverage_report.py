@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import csv
+import math
+from collections import Counter
+from typing import Hashable, Iterable
+
+from nearest import EARTH_KM, haversine_km
+
+RADIUS_KM = 50.0
+STORE_BLOCK = 256               # blok macierzy sklepy × dostawcy – ok. 8 MB na blok
+SUPPLIER_BLOCK = 4096
+
+
+def _unit_np(np, coords: list[tuple[float, float]]):
+    ll = np.radians(np.array(coords, dtype=float).reshape(-1, 2))
+    cos_lat = np.cos(ll[:, 0])
+    return np.column_stack((cos_lat * np.cos(ll[:, 1]), cos_lat * np.sin(ll[:, 1]), np.sin(ll[:, 0])))
+
+
+class CoverageReport:
+    """Ilu dostawców (wg kategorii) jest w promieniu ``radius_km`` od każdego sklepu.
+
+    Macierz odległości sklepy × dostawcy liczona jest blokami (NumPy,
+    iloczyn skalarny wektorów na sferze ≥ cos promienia ⇔ haversine ≤
+    promień), więc pamięć nie zależy od wielkości sieci. Wynik jest
+    pamiętany: ``sync`` porównuje dane z poprzednim stanem – przesunięty
+    sklep przelicza tylko swój wiersz, zmieniony dostawca tylko swoją
+    kolumnę (odjęcie starego wkładu, dodanie nowego).
+    """
+
+    def __init__(self, radius_km: float = RADIUS_KM):
+        self.radius_km = radius_km
+        self.rows: dict[Hashable, Counter] = {}
+        self._stores: dict[Hashable, tuple[float, float]] = {}
+        self._sups: dict[Hashable, tuple[float, float, str]] = {}
+
+    # ── aktualizacja ───────────────────────────────────
+    def sync(self, stores: Iterable[tuple[Hashable, float, float]],
+             suppliers: Iterable[tuple[Hashable, float, float, str]]) -> tuple[int, int]:
+        "dopasowanie do aktualnych danych; zwraca (przeliczone wiersze, przeliczone kolumny)"
+        stores = {k: (lat, lon) for k, lat, lon in stores if lat is not None}
+        sups = {k: (lat, lon, cat) for k, lat, lon, cat in suppliers if lat is not None}
+
+        for k in [k for k in self._stores if k not in stores]:
+            del self._stores[k]; self.rows.pop(k, None)
+        dirty_rows = [k for k, v in stores.items() if self._stores.get(k) != v]
+        self._stores.update((k, stores[k]) for k in dirty_rows)
+
+        gone = [(k, self._sups.pop(k)) for k in [k for k in self._sups if k not in sups]]
+        moved = [(k, self._sups[k]) for k, v in sups.items() if k in self._sups and self._sups[k] != v]
+        added = [(k, v) for k, v in sups.items() if self._sups.get(k) != v]
+        self._sups.update(added)
+
+        dirty = set(dirty_rows)
+        clean = [k for k in self._stores if k not in dirty]
+        # kolumny: stary wkład odejmujemy, nowy dodajemy – tylko dla wierszy, których i tak nie liczymy od nowa
+        columns = len(gone) + len(moved) + len(added)
+        if clean and columns:
+            if columns > len(self._sups) // 2:
+                dirty_rows = list(self._stores)          # zmienił się prawie każdy dostawca – taniej od zera
+            else:
+                self._count(clean, [v for _, v in gone + moved], -1)
+                self._count(clean, [v for _, v in added], +1)
+        for k in dirty_rows:
+            self.rows[k] = Counter()
+        self._count(dirty_rows, list(self._sups.values()), +1)
+        return len(dirty_rows), columns
+
+    def set_radius(self, radius_km: float) -> None:
+        "inny promień = wszystkie wiersze od nowa przy następnym sync"
+        if radius_km != self.radius_km:
+            self.radius_km = radius_km
+            self.rows.clear(); self._stores.clear(); self._sups.clear()
+
+    def _count(self, store_keys: list[Hashable], sups: list[tuple[float, float, str]], sign: int) -> None:
+        if not store_keys or not sups:
+            return
+        try:
+            import numpy as np
+        except ImportError:
+            for k in store_keys:
+                lat, lon = self._stores[k]
+                row = self.rows.setdefault(k, Counter())
+                for slat, slon, cat in sups:
+                    if haversine_km(lat, lon, slat, slon) <= self.radius_km:
+                        row[cat] += sign
+                for c in [c for c, n in row.items() if n == 0]:
+                    del row[c]
+            return
+        cats = sorted({c for _, _, c in sups})
+        code = {c: i for i, c in enumerate(cats)}
+        s_xyz = _unit_np(np, [self._stores[k] for k in store_keys])
+        p_xyz = _unit_np(np, [(lat, lon) for lat, lon, _ in sups])
+        onehot = np.zeros((len(sups), len(cats)), dtype=np.float32)
+        onehot[np.arange(len(sups)), [code[c] for _, _, c in sups]] = 1
+        limit = math.cos(self.radius_km / EARTH_KM)
+        counts = np.zeros((len(store_keys), len(cats)), dtype=np.int64)
+        for i in range(0, len(store_keys), STORE_BLOCK):
+            for j in range(0, len(sups), SUPPLIER_BLOCK):
+                within = (s_xyz[i:i + STORE_BLOCK] @ p_xyz[j:j + SUPPLIER_BLOCK].T) >= limit
+                counts[i:i + STORE_BLOCK] += (within.astype(np.float32) @ onehot[j:j + SUPPLIER_BLOCK]).astype(np.int64)
+        for k, row in zip(store_keys, counts.tolist()):
+            target = self.rows.setdefault(k, Counter())
+            for c, n in zip(cats, row):
+                if n:
+                    target[c] += sign * n
+            for c in [c for c, n in target.items() if n == 0]:
+                del target[c]
+
+    # ── wynik ──────────────────────────────────────────
+    def table(self) -> list[tuple[Hashable, int, Counter]]:
+        "(sklep, dostawców w promieniu, wg kategorii) – od najlepiej pokrytego"
+        return sorted(((k, sum(c.values()), c) for k, c in self.rows.items()), key=lambda r: -r[1])
+
+    def to_csv(self, path: str, label=str) -> None:
+        "sklep; kategoria; liczba dostawców (w promieniu radius_km)"
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            w = csv.writer(fh, delimiter=";")
+            w.writerow(["sklep", "kategoria", f"dostawcy_do_{self.radius_km:g}_km"])
+            for k, _, cats in self.table():
+                for cat, n in sorted(cats.items()):
+                    w.writerow([label(k), cat, n])
@@ -0,0 +1,66 @@
+"""Zdarzenia zmian w sieci: ``Repository`` publikuje, widoki subskrybują.
+
+Subskrybent dostaje listę zmian naraz (partię), więc import tysięcy encji
+to jedno wywołanie, a nie tysiąc. ``kinds`` przy subskrypcji zawęża
+dostawy do zmian danego rodzaju encji ("store", "employee", "supplier").
+"""
+from __future__ import annotations
+
+import contextlib
+from collections.abc import Callable, Iterable
+
+ADDED = "added"
+UPDATED = "updated"             # zmiana pól albo współrzędnych
+REMOVED = "removed"
+REASSIGNED = "reassigned"       # pracownik/dostawca przepięty do innego sklepu
+
+
+class Change:
+    "jedna zmiana encji; ``ident`` zapamiętany od razu – baza zeruje id usuniętych"
+    __slots__ = ("type", "entity", "ident", "old_store")
+
+    def __init__(self, type: str, entity, old_store=None):
+        self.type, self.entity, self.ident, self.old_store = type, entity, entity.id, old_store
+
+    @property
+    def kind(self) -> str:
+        return self.entity.kind
+
+    def __repr__(self) -> str:
+        return f"Change({self.type}, {self.kind} {self.ident})"
+
+
+class EventBus:
+    def __init__(self):
+        self._subs: list[tuple[Callable[[list[Change]], None], frozenset | None]] = []
+        self._pending: list[Change] = []
+        self._depth = 0
+
+    def subscribe(self, fn: Callable[[list[Change]], None], kinds: Iterable[str] | None = None) -> Callable[[], None]:
+        "zwraca funkcję wypisującą subskrybenta"
+        sub = (fn, frozenset(kinds) if kinds is not None else None)
+        self._subs.append(sub)
+        return lambda: self._subs.remove(sub) if sub in self._subs else None
+
+    def publish(self, changes: list[Change]) -> None:
+        if not changes:
+            return
+        if self._depth:
+            self._pending.extend(changes)
+            return
+        for fn, kinds in list(self._subs):
+            relevant = changes if kinds is None else [c for c in changes if c.entity.kind in kinds]
+            if relevant:
+                fn(relevant)
+
+    @contextlib.contextmanager
+    def batch(self):
+        "zmiany z kilku operacji (np. przepięcie + zapis) dostarczone razem na końcu bloku"
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if not self._depth:
+                changes, self._pending = self._pending, []
+                self.publish(changes)
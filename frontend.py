@@ -0,0 +1,91 @@
+"""Wspólne dla frontendów Tk (main.py, Notatnik.py) nad ``core``.
+
+Geokodowanie w tle z wynikami w wątku Tk i zadania startowe. Sam moduł
+nie importuje tkintera – potrzebuje tylko ``after``/``after_idle``/``bind``
+przekazanego okna.
+"""
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterable
+
+import metrics
+from core import PL_CENTER, locate, nominatim_geocode, wikigeocode
+from geocache import normalize_query
+from geoservice import GeocodeService, Ticket
+from httpclient import geo_http
+
+
+class TkGeocoder:
+    """``GeocodeService`` dla okna Tk: callbacki wracają przez ``app.after(0, ...)``.
+
+    Z ``repo`` zlokalizowana encja jest od razu zapisywana (``repo.update``),
+    a widoki dowiadują się o tym z ``repo.events``.
+    """
+
+    def __init__(self, app, repo=None):
+        self.app, self.repo = app, repo
+        self.service = GeocodeService(lambda fn, *args: app.after(0, fn, *args))
+
+    def geocode(self, addr: str, callback: Callable, owner=None) -> Ticket:
+        "adres sklepu (Nominatim)"
+        if metrics.enabled:
+            # od zlecenia do wyniku w wątku Tk (kolejka + sieć + after)
+            t0, done = time.perf_counter(), callback
+            def callback(coords):
+                metrics.record("threaded_geocode", time.perf_counter() - t0)
+                done(coords)
+        return self.service.submit(("nominatim", normalize_query(addr)), nominatim_geocode, addr,
+                                   callback=callback, owner=owner)
+
+    def locate(self, entity, location: str, on_done: Callable[[], None] | None = None,
+               owner=None, lookup=locate) -> Ticket:
+        "encja od razu w stanie 'lokalizacja…', współrzędne przychodzą w wątku Tk"
+        def _located(coords):
+            entity.lat, entity.lon = coords or PL_CENTER
+            if self.repo is not None and self.repo.get(entity.kind, entity.id) is entity:
+                self.repo.update(entity)
+            if on_done is not None:
+                on_done()
+        entity.lat = entity.lon = None
+        return self.service.submit((lookup.__name__, normalize_query(location)), lookup, location,
+                                   callback=_located, owner=owner or entity)
+
+    def prefetch(self, location: str, current: str, win) -> None:
+        "wstępne geokodowanie z okna edycji – zapis dołączy do tego samego zapytania"
+        if location and location != current:
+            self.service.submit(("wikigeocode", normalize_query(location)), wikigeocode, location,
+                                callback=lambda _: None, owner=win)
+
+    def cancel_with(self, win) -> None:
+        "zamknięcie okna edycji anuluje jego zapytania"
+        win.bind("<Destroy>", lambda ev: ev.widget is win and self.service.cancel_owner(win), add="+")
+
+    def cancel_owner(self, owner) -> None:
+        self.service.cancel_owner(owner)
+
+    def close(self) -> None:
+        self.service.shutdown()
+        geo_http.close()
+
+
+# ── start ──────────────────────────────────────────────
+def verify_presets(geo: TkGeocoder, repo, presets: Iterable[tuple]) -> None:
+    "opcjonalna weryfikacja adresów sklepów startowych w tle – zapis przez repo, marker przesuwa widok"
+    presets = {(n, a) for n, a, *_ in presets}
+    for st in [st for st in repo.stores.values() if (st.name, st.address) in presets]:
+        def _moved(coords, st=st):
+            if coords is None or repo.stores.get(st.id) is not st:
+                return
+            st.lat, st.lon = coords; repo.update(st)
+        geo.geocode(st.address, _moved)
+
+
+def after_first_window(app, t_start: float, *jobs: Callable[[], None]) -> None:
+    "czas do pierwszego okna w ``app.startup_ms`` (i metryce 'startup'), potem zadania startowe"
+    def _first_window():
+        app.startup_ms = (time.perf_counter() - t_start) * 1000
+        metrics.record("startup", app.startup_ms / 1000)
+        for job in jobs:
+            job()
+    app.after_idle(_first_window)
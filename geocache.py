@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import functools
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+Coords = tuple[float, float]
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geocache.sqlite3")
+DEFAULT_TTL = 30 * 24 * 3600          # trafienia – 30 dni
+DEFAULT_NEGATIVE_TTL = 24 * 3600      # "nie znaleziono" – 1 dzień
+DEFAULT_MAX_ENTRIES = 50_000
+MEMORY_ENTRIES = 4096
+EVICT_EVERY = 64
+
+MISSING = object()
+
+
+def normalize_query(query: str) -> str:
+    "klucz cache: małe litery, pojedyncze spacje, jednolite przecinki"
+    q = " ".join(query.casefold().split())
+    return re.sub(r"\s*,\s*", ", ", q).strip(" ,")
+
+
+class GeoCache:
+    """Trwały cache geokodowania (SQLite) z TTL, LRU i cache'owaniem braków.
+
+    Klucz to (dostawca, znormalizowane zapytanie). Braki (``None``) mają
+    osobny, krótszy TTL. Najczęściej używane wpisy trzymane są dodatkowo
+    w pamięci, więc powtórne zapytanie nie dotyka dysku.
+    """
+
+    def __init__(self,
+                 path: str = DEFAULT_PATH,
+                 ttl: float = DEFAULT_TTL,
+                 negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path, self.ttl, self.negative_ttl = path, ttl, negative_ttl
+        self.max_entries = max_entries
+        self.hits = self.misses = self.negative_hits = 0
+        self._puts = 0
+        self._lock = threading.RLock()
+        self._mem: OrderedDict[tuple[str, str], tuple[Coords | None, float]] = OrderedDict()
+        self._touched: dict[tuple[str, str], float] = {}
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        "plik otwierany (i tworzony) przy pierwszym użyciu – do tego czasu można zmienić ``path``"
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._open()
+            return self._conn
+
+    def _open(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS geocache (
+                provider   TEXT NOT NULL,
+                query      TEXT NOT NULL,
+                lat        REAL,
+                lon        REAL,
+                expires_at REAL NOT NULL,
+                used_at    REAL NOT NULL,
+                PRIMARY KEY (provider, query)
+            ) WITHOUT ROWID""")
+        db.execute("CREATE INDEX IF NOT EXISTS geocache_used ON geocache(used_at)")
+        return db
+
+    # ── odczyt / zapis ─────────────────────────────────
+    def get(self, provider: str, query: str):
+        "zwraca współrzędne, None (zapamiętany brak) albo MISSING"
+        key = (provider, normalize_query(query))
+        now = time.time()
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is None:
+                row = self._db.execute(
+                    "SELECT lat, lon, expires_at FROM geocache WHERE provider=? AND query=?", key
+                ).fetchone()
+                if row is not None:
+                    coords = None if row[0] is None else (row[0], row[1])
+                    entry = (coords, row[2])
+                    self._remember(key, entry)
+            if entry is None or entry[1] < now:
+                if entry is not None:
+                    self._forget(key)
+                self.misses += 1
+                return MISSING
+            self._mem.move_to_end(key)
+            self._touched[key] = now
+            if entry[0] is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return entry[0]
+
+    def put(self, provider: str, query: str, coords: Coords | None) -> None:
+        key = (provider, normalize_query(query))
+        now = time.time()
+        expires = now + (self.ttl if coords is not None else self.negative_ttl)
+        lat, lon = coords if coords is not None else (None, None)
+        with self._lock:
+            self._remember(key, (coords, expires))
+            self._db.execute(
+                "INSERT OR REPLACE INTO geocache VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, lat, lon, expires, now))
+            self._evict()
+
+    def cached(self, provider: str) -> Callable:
+        """Dekorator: funkcja zwraca współrzędne albo None (brak).
+
+        Wyjątek (np. błąd sieci) nie jest zapamiętywany i idzie dalej – liczy
+        go i obsługuje wołający (``GeocoderChain``).
+        """
+        def deco(fetch: Callable[[str], Coords | None]):
+            @functools.wraps(fetch)
+            def wrapper(query: str) -> Coords | None:
+                hit = self.get(provider, query)
+                if hit is not MISSING:
+                    return hit
+                coords = fetch(query)
+                self.put(provider, query, coords)
+                return coords
+            wrapper.uncached = fetch
+            return wrapper
+        return deco
+
+    # ── utrzymanie ─────────────────────────────────────
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {"hits": self.hits, "negative_hits": self.negative_hits, "misses": self.misses,
+                "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear(); self._touched.clear()
+            self._db.execute("DELETE FROM geocache")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush_touched()
+            self._conn.close(); self._conn = None
+
+    def _remember(self, key, entry) -> None:
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        if len(self._mem) > MEMORY_ENTRIES:
+            self._mem.popitem(last=False)
+
+    def _forget(self, key) -> None:
+        self._mem.pop(key, None); self._touched.pop(key, None)
+        self._db.execute("DELETE FROM geocache WHERE provider=? AND query=?", key)
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self._db.executemany(
+                "UPDATE geocache SET used_at=? WHERE provider=? AND query=?",
+                [(t, *k) for k, t in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self) -> None:
+        # liczymy wpisy co EVICT_EVERY zapisów; czasy użycia z pamięci trafiają
+        # na dysk dopiero teraz – same trafienia nic nie zapisują
+        self._puts += 1
+        if self._puts % EVICT_EVERY:
+            return
+        (count,) = self._db.execute("SELECT COUNT(*) FROM geocache").fetchone()
+        if count <= self.max_entries:
+            return
+        self._flush_touched()
+        self._db.execute("DELETE FROM geocache WHERE expires_at < ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM geocache WHERE (provider, query) IN "
+            "(SELECT provider, query FROM geocache ORDER BY used_at LIMIT "
+            "max(0, (SELECT COUNT(*) FROM geocache) - ?))", (self.max_entries,))
+        self._mem.clear()
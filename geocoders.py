@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import bisect
+import os
+import re
+import threading
+import time
+from array import array
+from collections.abc import Callable, Iterable
+
+from search import fold
+
+Coords = tuple[float, float]
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.tsv")
+
+_HOUSE_NO = re.compile(r"\s+\d+\w*(/\d+\w*)?$")     # "Modlińska 35" → "Modlińska"
+
+
+def http_errors() -> tuple[type[Exception], ...]:
+    "HTTP_ERRORS z httpclient – import (a z nim requests) dopiero, gdy źródło rzuci wyjątek"
+    from httpclient import HTTP_ERRORS
+    return HTTP_ERRORS
+
+
+class ProviderStats:
+    # zwykła klasa zamiast @dataclass – dataclasses (z inspect) to ~14 ms importu rdzenia
+    __slots__ = ("calls", "hits", "errors", "seconds")
+
+    def __init__(self, calls: int = 0, hits: int = 0, errors: int = 0, seconds: float = 0.0):
+        self.calls, self.hits, self.errors, self.seconds = calls, hits, errors, seconds
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.calls if self.calls else 0.0
+
+    @property
+    def avg_ms(self) -> float:
+        return 1000 * self.seconds / self.calls if self.calls else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.calls} zapytań, {self.hit_rate:.0%} trafień, {self.errors} błędów, {self.avg_ms:.1f} ms"
+
+
+class Provider:
+    """Źródło współrzędnych: ``lookup(query)`` zwraca (lat, lon) albo None,
+    a przy awarii rzuca jeden z ``HTTP_ERRORS``."""
+
+    def __init__(self, name: str, lookup: Callable[[str], Coords | None]):
+        self.name, self.lookup = name, lookup
+
+
+class Gazetteer(Provider):
+    """Offline: miejscowości (i opcjonalnie ulice) z pliku TSV.
+
+    Klucze (``fold`` nazwy, np. "lodz" albo "warszawa|modlinska") leżą
+    posortowane w jednej liście, współrzędne w dwóch ``array('d')`` – szukanie
+    to bisect, bez słownika obiektów na każdy wpis. Plik wczytywany przy
+    pierwszym zapytaniu.
+    """
+
+    def __init__(self, path: str = GAZETTEER_PATH, name: str = "gazetteer"):
+        super().__init__(name, self._lookup)
+        self.path = path
+        self._keys: list[str] | None = None
+        self._lat, self._lon = array("d"), array("d")
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._index())
+
+    def _index(self) -> list[str]:
+        with self._lock:
+            if self._keys is None:
+                rows = []
+                with open(self.path, encoding="utf-8") as fh:
+                    for line in fh:
+                        if not line.strip() or line.startswith("#"):
+                            continue
+                        town, street, lat, lon = line.rstrip("\n").split("\t")
+                        rows.append((self._key(town, street), float(lat), float(lon)))
+                rows.sort()
+                self._keys = [r[0] for r in rows]
+                self._lat, self._lon = array("d", (r[1] for r in rows)), array("d", (r[2] for r in rows))
+            return self._keys
+
+    @staticmethod
+    def _key(town: str, street: str = "") -> str:
+        town = fold(town).strip()
+        street = _HOUSE_NO.sub("", fold(street).strip())
+        return f"{town}|{street}" if street else town
+
+    def _lookup(self, query: str) -> Coords | None:
+        # "Miasto" → środek miasta; "Miasto, ulica 12" → tylko jeśli znamy ulicę
+        parts = [p for p in (s.strip() for s in query.split(",")) if p]
+        if not parts:
+            return None
+        if len(parts) == 1:
+            candidates = [self._key(parts[0])]
+        else:
+            candidates = [self._key(parts[0], parts[1]), self._key(parts[-1], parts[0])]
+        keys = self._index()
+        for key in candidates:
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return self._lat[i], self._lon[i]
+        return None
+
+
+class GeocoderChain:
+    """Kolejne źródła aż do pierwszego trafienia; ``fallback`` gdy wszystkie zawiodą.
+
+    Błąd jednego źródła (sieć, bezpiecznik) nie przerywa łańcucha. Dla każdego
+    źródła liczone są zapytania, trafienia, błędy i czas – ``stats()``.
+    """
+
+    def __init__(self, providers: Iterable[Provider], fallback: Coords | None = None):
+        self.providers = list(providers)
+        self.fallback = fallback
+        self._stats = {p.name: ProviderStats() for p in self.providers}
+        self._lock = threading.Lock()
+
+    def __call__(self, query: str) -> Coords | None:
+        for p in self.providers:
+            t = time.perf_counter()
+            try:
+                coords, failed = p.lookup(query), False
+            except http_errors():
+                coords, failed = None, True
+            self._record(p.name, time.perf_counter() - t, coords is not None, failed)
+            if coords is not None:
+                return coords
+        return self.fallback
+
+    def _record(self, name: str, seconds: float, hit: bool, failed: bool) -> None:
+        with self._lock:
+            st = self._stats[name]
+            st.calls += 1; st.seconds += seconds
+            st.hits += hit; st.errors += failed
+
+    def stats(self) -> dict[str, ProviderStats]:
+        with self._lock:
+            return {name: ProviderStats(s.calls, s.hits, s.errors, s.seconds)
+                    for name, s in self._stats.items()}
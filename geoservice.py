@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Iterable
+
+from geocache import MISSING, normalize_query
+
+Dispatch = Callable[..., Any]
+
+
+class Ticket:
+    "pojedyncza subskrypcja wyniku – można ją anulować; callback None = ktoś czeka na Future"
+    __slots__ = ("key", "callback", "owner", "cancelled")
+
+    def __init__(self, key: Hashable, callback: Callable | None, owner: Any = None):
+        self.key, self.callback, self.owner = key, callback, owner
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class GeocodeService:
+    """Wspólna pula wątków do geokodowania sklepów, pracowników i dostawców.
+
+    Zadania o tym samym kluczu, które są już w toku, są sklejane w jedno
+    (jeden request, wiele callbacków). Wynik trafia do callbacków przez
+    ``dispatch`` – w aplikacji to ``app.after(0, ...)``, czyli wątek Tk.
+    """
+
+    def __init__(self, dispatch: Dispatch | None = None, workers: int = 4):
+        self.dispatch = dispatch or (lambda fn, *args: fn(*args))
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="geocode")
+        self._lock = threading.Lock()
+        self._inflight: dict[Hashable, tuple[Future, list[Ticket]]] = {}
+
+    def submit(self, key: Hashable, fn: Callable, *args,
+               callback: Callable, owner: Any = None) -> Ticket:
+        ticket = Ticket(key, callback, owner)
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None:
+                entry[1].append(ticket)
+                return ticket
+            tickets = [ticket]
+            fut = self._pool.submit(fn, *args)
+            self._inflight[key] = (fut, tickets)
+        fut.add_done_callback(lambda f, key=key: self._done(key, f))
+        return ticket
+
+    def submit_many(self, name: str, fn: Callable, queries: Iterable[str],
+                    peek: Callable[[str], Any] | None = None) -> dict[str, Future]:
+        """Partia zapytań: zapytanie → Future z wynikiem ``fn(zapytanie)``.
+
+        Zapytania są normalizowane i deduplikowane (te same → ta sama Future),
+        trafienia ``peek`` (cache, zwraca MISSING przy braku) są od razu
+        gotowe, a reszta dołącza do zadań już w toku pod kluczem
+        ``(name, zapytanie)`` albo idzie do puli.
+        """
+        out: dict[str, Future] = {}
+        by_key: dict[Hashable, Future] = {}
+        for query in queries:
+            if query in out:
+                continue
+            key = (name, normalize_query(query))
+            fut = by_key.get(key)
+            if fut is None:
+                hit = peek(query) if peek is not None else MISSING
+                if hit is MISSING:
+                    fut = self._join(key, fn, query)
+                else:
+                    fut = Future(); fut.set_result(hit)
+                by_key[key] = fut
+            out[query] = fut
+        return out
+
+    def _join(self, key: Hashable, fn: Callable, query: str) -> Future:
+        # bilet bez callbacku – nigdy nie anulowany, więc zadanie nie wypadnie z kolejki
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None:
+                entry[1].append(Ticket(key, None))
+                return entry[0]
+            fut = self._pool.submit(fn, query)
+            self._inflight[key] = (fut, [Ticket(key, None)])
+        fut.add_done_callback(lambda f, key=key: self._done(key, f))
+        return fut
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def cancel(self, ticket: Ticket) -> None:
+        ticket.cancel()
+        self._drop_if_unwanted(ticket.key)
+
+    def cancel_owner(self, owner: Any) -> None:
+        "np. zamknięte okno edycji albo usunięty pracownik"
+        with self._lock:
+            keys = [k for k, (_, ts) in self._inflight.items()
+                    for t in ts if t.owner is owner and not t.cancelled]
+            for _, ts in self._inflight.values():
+                for t in ts:
+                    if t.owner is owner:
+                        t.cancel()
+        for k in keys:
+            self._drop_if_unwanted(k)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _drop_if_unwanted(self, key: Hashable) -> None:
+        # nikt już nie czeka – jeśli zadanie nie wystartowało, wyrzucamy je z kolejki
+        with self._lock:
+            entry = self._inflight.get(key)
+            if not entry or not all(t.cancelled for t in entry[1]):
+                return
+        # cancel() woła _done synchronicznie – poza blokadą
+        entry[0].cancel()
+
+    def _done(self, key: Hashable, fut: Future) -> None:
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is None or entry[0] is not fut:
+                return
+            del self._inflight[key]
+        if fut.cancelled():
+            return
+        try:
+            result = fut.result()
+        except Exception:
+            result = None
+        for t in entry[1]:
+            if not t.cancelled and t.callback is not None:
+                self.dispatch(self._deliver, t, result)
+
+    @staticmethod
+    def _deliver(ticket: Ticket, result) -> None:
+        # anulowanie mogło przyjść już po wysłaniu do wątku Tk
+        if not ticket.cancelled:
+            ticket.callback(result)
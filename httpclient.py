@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "ShopManagerApp/1.1 (kontakt@example.com)"
+
+# limity zapytań na host: (zapytań/s, maks. seria)
+HOST_LIMITS = {
+    "nominatim.openstreetmap.org": (1.0, 1),      # polityka Nominatim: 1 zapytanie/s
+    "pl.wikipedia.org": (10.0, 10),
+}
+DEFAULT_LIMIT = (5.0, 5)
+
+RETRIES = 3
+BACKOFF_S = 0.5                 # 0.5, 1, 2 s (+ losowy rozrzut)
+MAX_BACKOFF_S = 30.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+BREAKER_FAILURES = 5            # tyle kolejnych porażek otwiera bezpiecznik
+BREAKER_COOLDOWN_S = 60.0
+
+
+class ProviderUnavailable(RuntimeError):
+    "bezpiecznik otwarty albo serwer nadal odrzuca zapytania – wołający przechodzi do fallbacku"
+
+
+# błędy, po których geokoder powinien spróbować następnego źródła
+HTTP_ERRORS = (requests.RequestException, ProviderUnavailable, ValueError)
+
+
+class TokenBucket:
+    "``rate`` tokenów/s, najwyżej ``burst`` naraz; ``take`` czeka na token"
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate, self.burst = rate, burst
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1
+            # ujemny stan = kolejka; każdy czeka na swój token
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        "np. Retry-After – kolejne zapytania do hosta czekają co najmniej tyle"
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+class CircuitBreaker:
+    """Po ``failures`` kolejnych porażkach host jest pomijany przez ``cooldown``
+    sekund; potem przepuszczamy jedno zapytanie próbne."""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN_S):
+        self.failures, self.cooldown = failures, cooldown
+        self._count = 0
+        self._opened = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def open(self) -> bool:
+        with self._lock:
+            return self._count >= self.failures and time.monotonic() - self._opened < self.cooldown
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._count < self.failures:
+                return True
+            if time.monotonic() - self._opened < self.cooldown or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self._count, self._probing = 0, False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._count += 1
+            self._probing = False
+            if self._count >= self.failures:
+                self._opened = time.monotonic()
+
+
+class HttpClient:
+    """Wspólny klient HTTP geokoderów.
+
+    Jedna ``requests.Session`` z pulą połączeń (keep-alive), limit zapytań
+    per host (token bucket), ponawianie z wykładniczym odstępem przy
+    429/5xx i błędach sieci oraz bezpiecznik per host – gdy dostawca leży,
+    ``get`` od razu rzuca ``ProviderUnavailable`` zamiast czekać na timeout.
+    """
+
+    def __init__(self, limits: dict[str, tuple[float, int]] | None = None,
+                 retries: int = RETRIES, pool_size: int = 8):
+        self.limits = dict(HOST_LIMITS if limits is None else limits)
+        self.retries = retries
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter); self.session.mount("http://", adapter)
+        self._buckets: dict[str, TokenBucket] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(*self.limits.get(host, DEFAULT_LIMIT))
+            return self._buckets[host]
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker()
+            return self._breakers[host]
+
+    def get(self, url: str, timeout: float = 6, **kwargs) -> requests.Response:
+        "GET z limitem, ponawianiem i bezpiecznikiem; zwraca odpowiedź 2xx/4xx (bez 429)"
+        host = urlsplit(url).hostname or ""
+        bucket, breaker = self.bucket(host), self.breaker(host)
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                raise ProviderUnavailable(host)
+            bucket.take()
+            try:
+                resp = self.session.get(url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                breaker.failure()
+                if attempt == self.retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+            except requests.RequestException:
+                breaker.failure()           # bez ponawiania, ale zwalnia zapytanie próbne
+                raise
+            if resp.status_code not in RETRY_STATUS:
+                breaker.success()
+                return resp
+            breaker.failure()
+            resp.close()                    # połączenie wraca do puli (ważne przy stream=True)
+            if attempt == self.retries:
+                break
+            wait = self._retry_after(resp) or self._backoff(attempt)
+            bucket.pause(wait)
+        raise ProviderUnavailable(f"{host}: HTTP {resp.status_code}")
+
+    def get_json(self, url: str, **kwargs):
+        resp = self.get(url, **kwargs)
+        resp.raise_for_status()
+        return resp.json()
+
+    def close(self) -> None:
+        self.session.close()
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(MAX_BACKOFF_S, BACKOFF_S * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def _retry_after(resp: requests.Response) -> float | None:
+        try:
+            return min(MAX_BACKOFF_S, float(resp.headers.get("Retry-After", "")))
+        except ValueError:
+            return None
+
+
+geo_http = HttpClient()          # wspólny dla wszystkich geokoderów
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Iterator
+
+from geocache import MISSING, normalize_query
+
+Coords = tuple[float, float]
+
+KINDS = {"store": "store", "sklep": "store",
+         "employee": "employee", "pracownik": "employee",
+         "supplier": "supplier", "dostawca": "supplier"}
+
+REQUIRED = {"store": ("name", "address"),
+            "employee": ("fullname", "position", "location"),
+            "supplier": ("name", "category", "location")}
+
+# pole, po którym geokodujemy dany typ
+LOCATION_FIELD = {"store": "address", "employee": "location", "supplier": "location"}
+
+BATCH_SIZE = 500
+MAX_FAILURES = 1000            # tyle błędów trzymamy ze szczegółami
+
+
+@dataclass
+class ImportedRow:
+    kind: str
+    fields: dict[str, str]
+    coords: Coords | None
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    imported: int = 0
+    geocoded: int = 0              # unikalne lokalizacje wysłane do geokodera
+    failures: list[tuple[int, str]] = field(default_factory=list)
+    failed: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def fail(self, line: int, reason: str) -> None:
+        self.failed += 1
+        if len(self.failures) < MAX_FAILURES:
+            self.failures.append((line, reason))
+
+    def __str__(self) -> str:
+        return (f"{self.imported}/{self.rows} wierszy, {self.rows_per_s:.0f} wierszy/s, "
+                f"{self.failed} błędów, {self.geocoded} zapytań do geokodera")
+
+
+class RateLimiter:
+    "odstęp między wywołaniami – Nominatim pozwala na 1 zapytanie/s"
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+# ── parsowanie strumieniowe ────────────────────────────
+def iter_rows(path: str, kind: str | None = None) -> Iterator[tuple[int, dict[str, str] | None]]:
+    "(numer linii, wiersz) – plik czytany linia po linii, CSV albo JSONL; None = wiersz nieczytelny"
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8-sig", newline="") as fh:
+        if ext in (".jsonl", ".ndjson", ".json"):
+            for no, line in enumerate(fh, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    yield no, None
+                    continue
+                yield no, _with_kind(row, kind) if isinstance(row, dict) else None
+        else:
+            reader = csv.DictReader(fh)
+            for row in reader:
+                yield reader.line_num, _with_kind(row, kind)
+
+
+def _with_kind(row: dict, kind: str | None) -> dict[str, str]:
+    row = {k.strip().lower(): ("" if v is None else str(v).strip()) for k, v in row.items() if k}
+    if kind and not row.get("kind"):
+        row["kind"] = kind
+    return row
+
+
+def _coords_from_row(row: dict[str, str]) -> Coords | None:
+    try:
+        return float(row["lat"].replace(",", ".")), float(row["lon"].replace(",", "."))
+    except (KeyError, ValueError, AttributeError):
+        return None
+
+
+# ── pipeline ───────────────────────────────────────────
+def import_file(path: str,
+                geocoders: dict[str, Callable[[str], Coords | None]],
+                commit: Callable[[list[ImportedRow], ImportReport], None],
+                peek: Callable[[str, str], object] | None = None,
+                kind: str | None = None,
+                batch_size: int = BATCH_SIZE,
+                concurrency: int = 2,
+                rate_per_s: float = 1.0,
+                cancelled: Callable[[], bool] = lambda: False,
+                resolve_many: Callable[[str, list[str]], dict[str, Coords | None]] | None = None
+                ) -> ImportReport:
+    """Import CSV/JSONL partiami.
+
+    ``geocoders`` – funkcja geokodująca dla każdego typu (store/employee/supplier),
+    ``peek(kind, query)`` – odczyt z cache bez sieci (zwraca MISSING przy braku),
+    ``commit(batch, report)`` – wołane raz na partię, tam dodajemy encje i odświeżamy UI.
+    Lokalizacje są deduplikowane przed geokodowaniem; zapytania do sieci idą
+    przez pulę ``concurrency`` wątków i limit ``rate_per_s``, albo – jeśli
+    podano ``resolve_many(kind, zapytania)`` – całą partią przez nią.
+    """
+    report = ImportReport()
+    limiter = RateLimiter(rate_per_s)
+    resolved: dict[tuple[str, str], Coords | None] = {}
+
+    def lookup(key: tuple[str, str], query: str):
+        limiter.wait()
+        try:
+            return key, geocoders[key[0]](query)
+        except Exception:
+            return key, None
+
+    rows = iter_rows(path, kind)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="import") as pool:
+        while not cancelled():
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+            pending: list[tuple[int, str, dict[str, str], Coords | None, tuple[str, str] | None]] = []
+            todo: dict[tuple[str, str], str] = {}
+            for line, row in chunk:
+                report.rows += 1
+                if row is None:
+                    report.fail(line, "niepoprawny wiersz")
+                    continue
+                k = KINDS.get(row.get("kind", "").lower())
+                if k is None:
+                    report.fail(line, f"nieznany typ „{row.get('kind', '')}”")
+                    continue
+                missing = [f for f in REQUIRED[k] if not row.get(f)]
+                if missing:
+                    report.fail(line, "brak pól: " + ", ".join(missing))
+                    continue
+                coords = _coords_from_row(row)
+                key = None
+                if coords is None:
+                    query = row[LOCATION_FIELD[k]]
+                    key = (k, normalize_query(query))
+                    if key not in resolved and key not in todo:
+                        hit = peek(k, query) if peek else MISSING
+                        if hit is MISSING:
+                            todo[key] = query
+                        else:
+                            resolved[key] = hit
+                pending.append((line, k, row, coords, key))
+
+            report.geocoded += len(todo)
+            if resolve_many is None:
+                for key, coords in pool.map(lambda kv: lookup(*kv), todo.items()):
+                    resolved[key] = coords
+            else:
+                for k in {key[0] for key in todo}:
+                    queries = {key: query for key, query in todo.items() if key[0] == k}
+                    found = resolve_many(k, list(queries.values()))
+                    for key, query in queries.items():
+                        resolved[key] = found.get(query)
+
+            batch = []
+            for line, k, row, coords, key in pending:
+                if coords is None:
+                    coords = resolved.get(key)
+                if coords is None and k == "store":
+                    report.fail(line, f"adres „{row['address']}” nie znaleziony")
+                    continue
+                batch.append(ImportedRow(k, row, coords))
+            report.imported += len(batch)
+            report.elapsed = time.perf_counter() - report.started
+            if batch:
+                commit(batch, report)
+    report.elapsed = time.perf_counter() - report.started
+    return report
+
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Iterable
+
+from events import ADDED, REMOVED
+
+
+class VirtualList(ttk.Frame):
+    """Lista na ttk.Treeview, która rysuje tylko widoczne wiersze.
+
+    Źródłem jest lista id encji; ``label(id)`` daje tekst wiersza. Widget
+    ma stałą pulę ``height`` wierszy – przewijanie zmienia tylko ich teksty,
+    więc koszt nie zależy od długości listy. Zaznaczenie trzymane jest jako
+    id, nie indeks.
+    """
+
+    def __init__(self, master, label: Callable[[int], str], height: int = 12, width: int = 60):
+        super().__init__(master)
+        self.label, self.height = label, height
+        self.ids: list[int] = []
+        self._members: set[int] = set()     # te same id – szybkie ``in``
+        self.top = 0
+        self.selected: int | None = None
+        self._on_select: list[Callable[[], None]] = []
+
+        self.tree = ttk.Treeview(self, show="tree", height=height, selectmode="browse")
+        self.tree.column("#0", width=width * 7, stretch=True)
+        self.scroll = ttk.Scrollbar(self, orient="vertical", command=self._scroll_cmd)
+        self.tree.grid(row=0, column=0, sticky="nsew"); self.scroll.grid(row=0, column=1, sticky="ns")
+        self.columnconfigure(0, weight=1)
+        self._pool = [self.tree.insert("", tk.END, text="") for _ in range(height)]
+
+        self.tree.bind("<<TreeviewSelect>>", self._tree_select)
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(seq, self._wheel)
+        self.tree.bind("<Up>", lambda e: self._step(-1))
+        self.tree.bind("<Down>", lambda e: self._step(1))
+        self.tree.bind("<Prior>", lambda e: self._step(-height))
+        self.tree.bind("<Next>", lambda e: self._step(height))
+
+    # ── dane ───────────────────────────────────────────
+    def set_rows(self, ids: Iterable[int]) -> None:
+        "nowe źródło (np. zmiana filtra); zaznaczenie zostaje, jeśli id nadal jest na liście"
+        self.ids = list(ids)
+        self._members = set(self.ids)
+        if self.selected is not None and self.selected not in self._members:
+            self.selected = None
+        self.top = min(self.top, max(0, len(self.ids) - self.height))
+        self._render()
+
+    def append(self, ident: int) -> None:
+        self.extend([ident])
+
+    def extend(self, ids: Iterable[int]) -> None:
+        "dopisanie na końcu – rysujemy tylko, jeśli nowe wiersze wpadają w widoczne okno"
+        before = len(self.ids)
+        self.ids.extend(ids)
+        self._members.update(self.ids[before:])
+        if before - self.top < self.height:
+            self._render()
+        else:
+            self._update_scrollbar()
+
+    def __contains__(self, ident: int) -> bool:
+        return ident in self._members
+
+    def remove(self, ident: int) -> None:
+        if ident not in self._members:
+            return
+        idx = self.ids.index(ident)
+        del self.ids[idx]
+        self._members.discard(ident)
+        if self.selected == ident:
+            self.selected = None
+        if idx < self.top:
+            self.top -= 1
+            self._update_scrollbar()
+        else:
+            self.top = min(self.top, max(0, len(self.ids) - self.height))
+            self._render()
+
+    def apply(self, changes: Iterable, listed: Callable[[object], bool]) -> None:
+        """Poprawka z partii ``events.Change``: dopisanie, usunięcie albo nowa
+        etykieta pojedynczych wierszy; ``listed(encja)`` – czy encja ma być na liście."""
+        new: dict[int, None] = {}           # dodane w tej partii – usunięcie tylko je wycofuje
+        for c in changes:
+            if c.type == REMOVED or not listed(c.entity):
+                if c.ident in new: del new[c.ident]
+                elif c.type != ADDED: self.remove(c.ident)
+            elif c.ident in self:
+                self.refresh_row(c.ident)
+            else:
+                new[c.ident] = None         # nowy albo dopiero teraz pasuje do filtra/wyszukiwania
+        if new: self.extend(new)
+
+    def refresh_row(self, ident: int) -> None:
+        "nowa etykieta jednego wiersza – tylko jeśli jest widoczny"
+        window = self.ids[self.top:self.top + self.height]
+        if ident in window:
+            self.tree.item(self._pool[window.index(ident)], text=self.label(ident))
+
+    def selected_id(self) -> int | None:
+        return self.selected
+
+    def on_select(self, callback: Callable[[], None]) -> None:
+        self._on_select.append(callback)
+
+    def on_double(self, callback: Callable[[], None]) -> None:
+        self.tree.bind("<Double-1>", lambda e: callback())
+
+    # ── rysowanie ──────────────────────────────────────
+    def _render(self) -> None:
+        window = self.ids[self.top:self.top + self.height]
+        sel = None
+        for slot, iid in enumerate(self._pool):
+            if slot < len(window):
+                self.tree.item(iid, text=self.label(window[slot]))
+                if window[slot] == self.selected:
+                    sel = iid
+            else:
+                self.tree.item(iid, text="")
+        # <<TreeviewSelect>> przyjdzie później – _tree_select pominie niezmienione zaznaczenie
+        self.tree.selection_set(sel if sel else ())
+        self._update_scrollbar()
+
+    def _update_scrollbar(self) -> None:
+        n = len(self.ids)
+        if n <= self.height:
+            self.scroll.set(0.0, 1.0)
+        else:
+            self.scroll.set(self.top / n, (self.top + self.height) / n)
+
+    def _scroll_to(self, top: int) -> None:
+        top = max(0, min(top, len(self.ids) - self.height))
+        if top != self.top:
+            self.top = top
+            self._render()
+
+    def _scroll_cmd(self, *args) -> None:
+        if args[0] == "moveto":
+            self._scroll_to(round(float(args[1]) * len(self.ids)))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self.height if args[2] == "pages" else 1)
+            self._scroll_to(self.top + step)
+
+    def _wheel(self, event) -> str:
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self._scroll_to(self.top - 3)
+        else:
+            self._scroll_to(self.top + 3)
+        return "break"
+
+    def _step(self, delta: int) -> str:
+        if not self.ids:
+            return "break"
+        idx = self.ids.index(self.selected) if self.selected in self.ids else self.top - (delta > 0)
+        idx = max(0, min(len(self.ids) - 1, idx + delta))
+        self.selected = self.ids[idx]
+        if idx < self.top:
+            self.top = idx
+        elif idx >= self.top + self.height:
+            self.top = idx - self.height + 1
+        self._render()
+        self._fire()
+        return "break"
+
+    def _tree_select(self, _event) -> None:
+        sel = self.tree.selection()
+        if not sel:
+            return
+        slot = self._pool.index(sel[0])
+        if self.top + slot >= len(self.ids):
+            self.tree.selection_set(())
+            return
+        if self.ids[self.top + slot] != self.selected:
+            self.selected = self.ids[self.top + slot]
+            self._fire()
+
+    def _fire(self) -> None:
+        for cb in self._on_select:
+            cb()
@@ -1,12 +1,26 @@
 from __future__ import annotations
 
+import csv
 import threading
+import time
 import tkinter as tk
-from tkinter import messagebox, ttk
+from concurrent.futures import Future
+from tkinter import filedialog, messagebox, simpledialog, ttk
 
-import requests
 import tkintermapview
-from bs4 import BeautifulSoup
+
+import metrics
+from core import (PL_CENTER, Employee, Store, Supplier, gazetteer, geo_cache, locate,
+                  nominatim_geocode, open_network, wikigeocode)
+from coverage_report import CoverageReport
+from events import ADDED, REASSIGNED, REMOVED
+from frontend import TkGeocoder, after_first_window, verify_presets
+from geocache import MISSING
+from importer import import_file
+from listview import VirtualList
+from markers import MarkerManager
+from refresh import RefreshScheduler
+from spatial import ClusterIndex, GridIndex, map_view
 
 # dane logowania
 USER_CREDENTIALS = {"admin": "admin123"}
@@ -18,107 +32,10 @@ PRESET_STORES = [
     ("Lidl", "Warszawa, Radzymińska 314", 52.2934, 21.0815)
 ]
 
-PL_CENTER = (52.2297, 21.0122)
-
-# geokodowanie
-def geocode(query: str) -> tuple[float, float] | None:
-    "dla OSM"
-    try:
-        data = requests.get(
-            "https://nominatim.openstreetmap.org/search",
-            params={"q": query, "format": "json", "limit": 1},
-            headers={"User-Agent": "ShopManagerApp"},
-            timeout=5
-        ).json()
-        return (float(data[0]["lat"]), float(data[0]["lon"])) if data else None
-    except Exception:
-        return None
-
-nominatim_geocode = geocode
-
-def wikigeocode(city: str) -> tuple[float, float]:
-    try:
-        html = requests.get(f"https://pl.wikipedia.org/wiki/{city.strip()}", timeout=6).text
-        soup = BeautifulSoup(html, "html.parser")
-        lat = soup.select('.latitude')[1].text.replace(',', '.')
-        lon = soup.select('.longitude')[1].text.replace(',', '.')
-        return float(lat), float(lon)
-    except Exception:
-        return PL_CENTER
-
-# modele
-class Store:
-    def __init__(self, name: str, address: str):
-        self.name, self.address = name, address
-        self.employees: list[Employee] = []
-        self.suppliers: list[Supplier] = []
-        self.marker = None
-        coords = nominatim_geocode(address)
-        if coords is None:
-            raise ValueError(f"Adres „{address}” nie znaleziony w OSM.")
-        self.lat, self.lon = coords
-
-    @classmethod
-    def raw(cls, name: str, address: str, lat: float, lon: float) -> "Store":
-        obj = object.__new__(cls)
-        obj.name, obj.address = name, address
-        obj.lat, obj.lon = lat, lon
-        obj.employees, obj.suppliers, obj.marker = [], [], None
-        return obj
-
-    def __str__(self) -> str:
-        return f"{self.name} ({self.address})"
-
-
-class Employee:
-    def __init__(self,
-                 fullname: str,
-                 position: str,
-                 location: str,
-                 store: Store | None = None):
-
-        self.fullname, self.position, self.location = fullname, position, location
-        self.store = store
-        self.marker = None
-
-        # ➊ jeśli przypisany do sklepu → bierzemy współrzędne sklepu
-        if store is not None:
-            self.lat, self.lon = store.lat, store.lon
-        else:
-            # ➋ najpierw próbujemy Nominatim, potem fallback do wiki
-            self.latlon_from_location(location)
-
-    # pomocnicza metoda
-    def latlon_from_location(self, location: str) -> None:
-        coords = nominatim_geocode(location)
-        if coords is None:
-            coords = wikigeocode(location.split(",")[0])
-        self.lat, self.lon = coords
-
-    def __str__(self):
-        return f"{self.fullname} – {self.position} ({self.location})"
-
-class Supplier:
-    def __init__(self,
-                 name: str,
-                 category: str,
-                 location: str,
-                 store: Store | None = None):
-
-        self.name, self.category, self.location = name, category, location
-        self.store = store
-        self.marker = None
-
-        if store is not None:
-            self.lat, self.lon = store.lat, store.lon
-        else:
-            self.latlon_from_location(location)
-
-    # ta sama pomocnicza metoda co wyżej
-    latlon_from_location = Employee.latlon_from_location
-
-    def __str__(self):
-        return f"{self.name} – {self.category} ({self.location})"
+VERIFY_PRESETS = False          # sprawdzanie adresów sklepów startowych w tle
+VIEW_MARGIN = 0.25              # zapas wokół widoku mapy (ułamek szerokości)
+MOVE_DEBOUNCE_MS = 120          # przeliczenie mapy po ustaniu ruchu
+SEARCH_DEBOUNCE_MS = 80         # wyszukiwanie po przerwie w pisaniu
 
 # ─────────  LOGOWANIE  ─────────
 def verify_login(username: str, password: str) -> bool:
@@ -135,99 +52,229 @@ def attempt_login() -> None:
 
 # ─────────  GŁÓWNA APP  ─────────
 def launch_main_app() -> None:
-    # centralne listy
-    stores: list[Store] = []
-    employees: list[Employee] = []
-    suppliers: list[Supplier] = []
-
-    # sklepy startowe
-    for n, a, lat, lon in PRESET_STORES:
-        try:
-            st = Store(n, a)
-        except ValueError:
-            st = Store.raw(n, a, lat, lon)
-        st.lat, st.lon = lat, lon
-        stores.append(st)
+    # sieć z bazy; przy pierwszym starcie sklepy startowe z PRESET_STORES –
+    # w obu przypadkach bez geokodowania przed oknem
+    t_start = time.perf_counter()
+    repo = open_network(presets=PRESET_STORES)
+    db = repo.storage
+    # słowniki id → encja
+    stores, employees, suppliers = repo.stores, repo.employees, repo.suppliers
+
+    # id sklepów w kolejności pozycji comboboxów
+    combo_ids: list[int] = []
 
     app = tk.Tk()
     app.title("System Zarządzania Sklepami")
     app.geometry("1280x760")
+    refresh = RefreshScheduler(app)     # zmiany z repo.events – najwyżej jedno odświeżenie widoku na klatkę
 
-    current_markers: list[tkintermapview.TkinterMapView] = []
+    shown_view = None           # widok, dla którego ostatnio dopasowano mapę
 
     # ── helpers ─────────────────────────────────────────
-    def clear_markers():
-        for m in current_markers:
-            m.delete()
-        current_markers.clear()
-
-    def fit_map():
-        if not current_markers:
+    def fit_map(pos: list[tuple[float, float]]):
+        if not pos:
             return
-        lats = [m.position[0] for m in current_markers]
-        lons = [m.position[1] for m in current_markers]
-        map_w.set_position(sum(lats) / len(lats), sum(lons) / len(lons))
-        map_w.set_zoom(6 if len(current_markers) > 4 else 8)
+        map_w.set_position(sum(p[0] for p in pos) / len(pos), sum(p[1] for p in pos) / len(pos))
+        map_w.set_zoom(6 if len(pos) > 4 else 8)
 
+    @metrics.timed("refresh_store_lb")
     def refresh_store_lb():
-        store_lb.delete(0, tk.END)
-        for i, st in enumerate(stores):
-            store_lb.insert(i, str(st))
+        store_lb.set_rows(stores)
 
+    def filtered_store(cmb: ttk.Combobox) -> Store | None:
+        "sklep wybrany w filtrze (None = wszystkie)"
+        idx = cmb.current()
+        if idx <= 0:
+            cmb.set("– Wszystkie –")
+            return None
+        return stores.get(combo_ids[idx - 1])
+
+    @metrics.timed("refresh_emp_lb")
     def refresh_emp_lb():
-        employee_lb.delete(0, tk.END)
-        flt = emp_filter_cmb.get()
-        src = employees if flt == "– Wszystkie –" else (
-            next((s for s in stores if str(s) == flt), None).employees or [])
-        for i, e in enumerate(src):
-            employee_lb.insert(i, str(e))
+        employee_lb.set_rows(repo.search("employee", emp_query.get(), filtered_store(emp_filter_cmb)))
 
+    @metrics.timed("refresh_sup_lb")
     def refresh_sup_lb():
-        supplier_lb.delete(0, tk.END)
-        flt = sup_filter_cmb.get()
-        src = suppliers if flt == "– Wszystkie –" else (
-            next((s for s in stores if str(s) == flt), None).suppliers or [])
-        for i, s in enumerate(src):
-            supplier_lb.insert(i, str(s))
+        supplier_lb.set_rows(repo.search("supplier", sup_query.get(), filtered_store(sup_filter_cmb)))
+
+    def listed(ent) -> bool:
+        "czy encja pasuje do filtra sklepu i wyszukiwania swojej zakładki"
+        cmb, query = ((emp_filter_cmb, emp_query) if ent.kind == "employee"
+                      else (sup_filter_cmb, sup_query))
+        st = filtered_store(cmb)
+        return (st is None or ent.store is st) and repo.matches(ent, query.get())
+
+    search_jobs: dict[str, str] = {}
+
+    def on_query(kind: str):
+        "wyszukiwanie przy pisaniu – kolejne znaki w odstępie SEARCH_DEBOUNCE_MS dają jedno odświeżenie"
+        if kind in search_jobs:
+            app.after_cancel(search_jobs[kind])
+        search_jobs[kind] = app.after(SEARCH_DEBOUNCE_MS, lambda: (search_jobs.pop(kind), refresh.invalidate(kind)))
 
     def sync_store_combos():
-        vals = [str(s) for s in stores]
+        "wartości comboboxów sklepów; wybór zostaje przy tym samym sklepie, usunięty zdejmuje filtr"
+        vals = [str(s) for s in stores.values()]
+        if combo_ids == list(stores) and emp_filter_cmb["values"][1:] == tuple(vals):
+            return
+        chosen = {cmb: combo_ids[cmb.current() - 1] if cmb.current() > 0 else None
+                  for cmb in (emp_filter_cmb, sup_filter_cmb, emp_assign_cmb, sup_assign_cmb)}
+        combo_ids[:] = stores
         emp_filter_cmb["values"] = ["– Wszystkie –"] + vals
         sup_filter_cmb["values"] = ["– Wszystkie –"] + vals
         emp_assign_cmb["values"] = ["(brak)"] + vals
         sup_assign_cmb["values"] = ["(brak)"] + vals
+        pos = {sid: i + 1 for i, sid in enumerate(combo_ids)}
+        for cmb, sid in chosen.items():
+            if sid is None:
+                continue
+            cmb.current(pos.get(sid, 0))
+            if sid not in pos and cmb is emp_filter_cmb: refresh.invalidate("employee")
+            elif sid not in pos and cmb is sup_filter_cmb: refresh.invalidate("supplier")
+
+    def assigned_store(cmb: ttk.Combobox) -> Store | None:
+        "sklep wybrany w comboboxie przypisania ((brak) = None)"
+        idx = cmb.current()
+        return stores.get(combo_ids[idx - 1]) if idx > 0 else None
 
     # ── MAPA ────────────────────────────────────────────
-    def refresh_map(*_):
-        clear_markers()
-        view = map_view_cmb.get()
+    # widoki całej sieci – klastry zależne od zoomu, tylko w obrębie widoku
+    clusters = {"Pracownicy – cała sieć": ClusterIndex(), "Dostawcy – cała sieć": ClusterIndex()}
+    CLUSTER_COLORS = {"Pracownicy – cała sieć": ("orange", "darkorange3"),
+                      "Dostawcy – cała sieć": ("green", "darkgreen")}
+
+    def cluster_source(view: str):
+        src = employees if view == "Pracownicy – cała sieć" else suppliers
+        return ((x, x.lat, x.lon) for x in src.values() if not x.pending)
+
+    # sklepy – bez klastrów, ale tylko te w obrębie widoku (+ margines)
+    store_index = GridIndex()
 
+    def map_specs(view: str):
+        zoom, box = map_view(map_w, margin=VIEW_MARGIN)
         if view == "Sklepy – wszystkie":
-            for st in stores:
-                st.marker = map_w.set_marker(st.lat, st.lon, text=st.name, marker_color_outside="blue")
-                current_markers.append(st.marker)
-            fit_map()
-
-        elif view == "Pracownicy – cała sieć":
-            for e in employees:
-                e.marker = map_w.set_marker(e.lat, e.lon, text=e.fullname, marker_color_outside="orange")
-                current_markers.append(e.marker)
-            fit_map()
-
-        elif view == "Dostawcy – cała sieć":
-            for s in suppliers:
-                s.marker = map_w.set_marker(s.lat, s.lon,
-                                            text=s.name,
-                                            marker_color_outside="green")
-                current_markers.append(s.marker)
-            fit_map()
-
-    # ── geokoder w wątku ────────────────────────────────
-    def threaded_geocode(addr: str, callback):
-        def job():
-            coords = nominatim_geocode(addr)
-            app.after(0, callback, coords)
-        threading.Thread(target=job, daemon=True).start()
+            return ((st, lat, lon, st.name, "blue") for st, lat, lon in store_index.query(box))
+        idx = clusters.get(view)
+        if idx is None:
+            return ()
+        single, many = CLUSTER_COLORS[view]
+        return ((key, lat, lon, getattr(key, "fullname", None) or key.name, single) if count == 1
+                else (cell, lat, lon, str(count), many)
+                for key, lat, lon, count, cell in idx.clusters(zoom, box))
+
+    @metrics.timed("refresh_map")
+    def refresh_map(*_):
+        # tylko różnice względem tego, co już jest na mapie
+        nonlocal shown_view
+        view = map_view_cmb.get()
+        idx = clusters.get(view)
+        if idx is not None:
+            idx.sync(cluster_source(view))
+        elif view == "Sklepy – wszystkie":
+            idx = store_index
+            idx.sync((st, st.lat, st.lon) for st in stores.values())
+        if view != shown_view:
+            shown_view = view
+            if idx is not None:
+                fit_map([(p[2], p[3]) for p in idx.points.values()])
+        markers.sync(map_specs(view))
+
+    move_job = None
+
+    def on_map_move(*_):
+        "przesunięcie/zoom mapy – markery w widoku przeliczamy dopiero, gdy ruch ucichnie"
+        nonlocal move_job
+        if move_job is not None:
+            app.after_cancel(move_job)
+        move_job = app.after(MOVE_DEBOUNCE_MS, refresh_viewport)
+
+    @metrics.timed("refresh_viewport")
+    def refresh_viewport():
+        nonlocal move_job
+        move_job = None
+        markers.sync(map_specs(map_view_cmb.get()))
+
+    def zoom_into(key):
+        "kliknięcie w klaster – przybliżenie na jego środek"
+        if isinstance(key, tuple):
+            map_w.set_position(*markers.position(key))
+            map_w.set_zoom(key[0] + 2)
+            refresh_viewport()
+
+    # ── zdarzenia zmian – każdy widok poprawia tylko to, czego zmiana dotyczy ──
+    MAP_KINDS = {"Sklepy – wszystkie": "store", "Pracownicy – cała sieć": "employee",
+                 "Dostawcy – cała sieć": "supplier"}
+
+    def patch_stores(changes):
+        new: dict[int, None] = {}           # partia może mieć dodanie i usunięcie tego samego id
+        for c in changes:
+            if c.type == ADDED: new[c.ident] = None
+            elif c.type == REMOVED:
+                if c.ident in new: del new[c.ident]
+                else: store_lb.remove(c.ident)
+            else: store_lb.refresh_row(c.ident)
+        if new: store_lb.extend(new)
+
+    def map_changes(changes):
+        "do mapy trafiają tylko zmiany rodzaju encji z bieżącego widoku; reszta dogoni przy jego zmianie"
+        kind = MAP_KINDS.get(map_view_cmb.get())
+        relevant = [c for c in changes if c.kind == kind and c.type != REASSIGNED]
+        if relevant:
+            refresh.push("map", relevant)
+
+    def patch_map(changes):
+        view = map_view_cmb.get()
+        kind = MAP_KINDS.get(view)
+        idx = clusters.get(view, store_index)
+        touched = False
+        for c in changes:
+            if c.kind != kind or c.type == REASSIGNED:
+                continue
+            if c.type == REMOVED or c.entity.pending:
+                idx.remove(c.entity)
+            else:
+                idx.add(c.entity, c.entity.lat, c.entity.lon)
+            touched = True
+        if touched:
+            markers.sync(map_specs(view))
+
+    # ── geokoder w puli wątków ──────────────────────────
+    geo = TkGeocoder(app, repo)         # zlokalizowane encje zapisuje repo – widoki przez repo.events
+
+    metrics.source("geocode_queue", lambda: {"in_flight": geo.service.pending()})
+
+    def geocode_many(kind: str, queries) -> dict[str, Future]:
+        "partia zapytań – trafienia w cache od razu, duplikaty i zapytania w toku sklejone"
+        name, fn = ("nominatim", nominatim_geocode) if kind == "store" else ("locate", locate)
+        return geo.service.submit_many(name, fn, queries, peek=lambda q: peek_cached(kind, q))
+
+    def relocate(entities):
+        "ponowne geokodowanie pracowników/dostawców – jedno zapytanie na lokalizację, jeden zapis"
+        groups: dict[str, list] = {}
+        for ent in entities:
+            groups.setdefault(ent.location, []).append(ent)
+        by_future: dict[Future, list[str]] = {}
+        for loc, fut in geocode_many("employee", groups).items():   # osoby i dostawcy – ten sam łańcuch
+            by_future.setdefault(fut, []).append(loc)
+        changed, left = [], [len(by_future)]
+
+        def _apply(locs: list[str], fut: Future):
+            coords = None if fut.cancelled() or fut.exception() else fut.result()
+            for loc in locs:
+                for ent in groups[loc]:
+                    if repo.get(ent.kind, ent.id) is ent:
+                        ent.lat, ent.lon = coords or PL_CENTER
+                        changed.append(ent)
+            left[0] -= 1
+            if not left[0]:
+                repo.update_many(changed)
+
+        for fut, locs in by_future.items():
+            fut.add_done_callback(lambda f, locs=locs: app.after(0, _apply, locs, f))
+
+    def regeocode_all():
+        "pracownicy i dostawcy bez sklepu (ze sklepem mają jego współrzędne)"
+        relocate(e for lst in (employees, suppliers) for e in lst.values() if e.store is None)
 
     # ── CRUD sklepów ────────────────────────────────────
     def add_store():
@@ -240,27 +287,22 @@ def launch_main_app() -> None:
             if coords is None:
                 messagebox.showerror("Geokoder", f"Adres „{addr}” nie znaleziono.")
                 return
-            stores.append(Store.raw(name, addr, *coords))
+            st = Store.raw(name, addr, *coords)
+            repo.add(st)
             store_name_ent.delete(0, tk.END); store_loc_ent.delete(0, tk.END)
-            refresh_store_lb(); sync_store_combos(); refresh_map()
 
-        threaded_geocode(addr, _finish)
+        geo.geocode(addr, _finish)
 
     def del_store():
-        if not store_lb.curselection():
+        st = stores.get(store_lb.selected_id())
+        if st is None:
             return
-        idx = store_lb.curselection()[0]
-        st = stores.pop(idx)
-        if st.marker: st.marker.delete()
-        for e in list(st.employees): employees.remove(e)
-        for s in list(st.suppliers): suppliers.remove(s)
-        refresh_store_lb(); refresh_emp_lb(); refresh_sup_lb()
-        sync_store_combos(); refresh_map()
+        for ent in repo.remove(st): geo.cancel_owner(ent)
 
     def edit_store():
-        if not store_lb.curselection():
+        st = stores.get(store_lb.selected_id())
+        if st is None:
             return
-        st = stores[store_lb.curselection()[0]]
 
         win = tk.Toplevel(app); win.title("Edytuj sklep")
         ttk.Label(win, text="Nazwa:").grid(row=0, column=0, sticky="e")
@@ -279,41 +321,112 @@ def launch_main_app() -> None:
                     messagebox.showerror("Geokoder", f"Adres „{new_addr}” nie znaleziono.")
                     return
                 st.name, st.address, (st.lat, st.lon) = new_name, new_addr, coords
-                refresh_store_lb(); sync_store_combos(); refresh_map(); win.destroy()
+                repo.update(st)
+                win.destroy()
 
-            threaded_geocode(new_addr, _finish)
+            geo.geocode(new_addr, _finish, owner=win)
 
+        geo.cancel_with(win)
         ttk.Button(win, text="Zapisz", command=_save).grid(row=2, columnspan=2, pady=6)
 
+    # ── import CSV/JSONL ────────────────────────────────
+    def peek_cached(kind: str, query: str):
+        "gazetteer albo cache – brak w Nominatim dla osób oznacza jeszcze fallback do wiki"
+        hit = None if kind == "store" else gazetteer.lookup(query)
+        if hit is not None:
+            return hit
+        hit = geo_cache.get("nominatim", query)
+        return MISSING if hit is None and kind != "store" else hit
+
+    def apply_import(batch, report, done: threading.Event):
+        # kolumna "store": etykieta sklepu albo sam adres
+        new_stores: dict[str, Store] = {}
+        by_address: dict[str, Store] | None = None
+        added = []
+        for row in batch:
+            f = row.fields
+            if row.kind == "store":
+                st = Store.raw(f["name"], f["address"], *row.coords)
+                new_stores[str(st)] = new_stores[st.address] = st
+                added.append(st)
+                continue
+            ref = f.get("store", "")
+            st = (new_stores.get(ref) or repo.store_by_label(ref)) if ref else None
+            if ref and st is None:
+                if by_address is None:
+                    by_address = {s.address: s for s in stores.values()}
+                st = by_address.get(ref)
+            if row.kind == "employee":
+                ent = Employee(f["fullname"], f["position"], f["location"], st, resolve=False)
+            else:
+                ent = Supplier(f["name"], f["category"], f["location"], st, resolve=False)
+            if st is None:
+                ent.lat, ent.lon = row.coords or PL_CENTER
+            added.append(ent)
+        repo.add_many(added)            # jedno zdarzenie na partię – widoki dopisują tylko nowe wiersze
+        import_status.config(text=f"Import: {report}")
+        done.set()
+
+    def import_data():
+        path = filedialog.askopenfilename(
+            title="Import sklepów, pracowników i dostawców",
+            filetypes=[("CSV / JSONL", "*.csv *.jsonl *.ndjson"), ("Wszystkie pliki", "*.*")])
+        if not path:
+            return
+
+        def _commit(batch, report):
+            # czekamy, aż wątek Tk przyjmie partię – pamięć nie rośnie ponad jedną partię
+            done = threading.Event()
+            app.after(0, apply_import, batch, report, done)
+            done.wait()
+
+        def resolve_many(kind: str, queries: list[str]) -> dict:
+            out = {}
+            for query, fut in geocode_many(kind, queries).items():
+                try:
+                    out[query] = fut.result()
+                except Exception:
+                    out[query] = None
+            return out
+
+        def job():
+            try:
+                report = import_file(path, {"store": nominatim_geocode, "employee": locate,
+                                            "supplier": locate},
+                                     _commit, peek=peek_cached, resolve_many=resolve_many)
+            except (OSError, UnicodeDecodeError, csv.Error, ValueError, KeyError, TypeError) as exc:
+                # ValueError obejmuje zły JSON, KeyError/TypeError – brakujące albo nadmiarowe pola
+                app.after(0, lambda: import_status.config(text="Import: błąd"))
+                app.after(0, messagebox.showerror, "Import", f"Nie można wczytać pliku:\n{exc!r}")
+                return
+            lines = "\n".join(f"linia {no}: {why}" for no, why in report.failures[:10])
+            app.after(0, messagebox.showinfo, "Import zakończony", f"{report}\n{lines}".strip())
+
+        import_status.config(text="Import: wczytywanie…")
+        threading.Thread(target=job, daemon=True).start()
+
     # ── CRUD pracowników ───────────────────────────────
     def add_emp():
         fn, pos, loc = emp_name_ent.get().strip(), emp_pos_ent.get().strip(), emp_loc_ent.get().strip()
         if not fn or not pos or not loc:
             return
-        idx = emp_assign_cmb.current() - 1
-        st = stores[idx] if idx >= 0 else None
-        e = Employee(fn, pos, loc, st)
-        employees.append(e)
-        if st: st.employees.append(e)
+        st = assigned_store(emp_assign_cmb)
+        e = Employee(fn, pos, loc, st, resolve=False)
+        repo.add(e)
+        if st is None: geo.locate(e, loc)
         for w in (emp_name_ent, emp_pos_ent, emp_loc_ent): w.delete(0, tk.END)
-        emp_assign_cmb.set("(brak)"); refresh_emp_lb(); refresh_map()
+        emp_assign_cmb.set("(brak)")
 
     def del_emp():
-        if not employee_lb.curselection():
+        e = employees.get(employee_lb.selected_id())
+        if e is None:
             return
-        flt, idx = emp_filter_cmb.get(), employee_lb.curselection()[0]
-        e = employees.pop(idx) if flt == "– Wszystkie –" else (
-            next(s for s in stores if str(s) == flt).employees.pop(idx))
-        if e.marker: e.marker.delete()
-        if e in employees: employees.remove(e)
-        refresh_emp_lb(); refresh_map()
+        geo.cancel_owner(e); repo.remove(e)
 
     def edit_emp():
-        if not employee_lb.curselection():
+        e = employees.get(employee_lb.selected_id())
+        if e is None:
             return
-        flt, idx = emp_filter_cmb.get(), employee_lb.curselection()[0]
-        e = employees[idx] if flt == "– Wszystkie –" else (
-            next(s for s in stores if str(s) == flt).employees[idx])
 
         win = tk.Toplevel(app); win.title("Edytuj pracownika")
         for i, (lbl, val) in enumerate([("Imię i nazwisko:", e.fullname),
@@ -325,21 +438,23 @@ def launch_main_app() -> None:
             elif i == 1: pos_ent = ent
             else: loc_ent = ent
         ttk.Label(win, text="Sklep:").grid(row=3, column=0, sticky="e")
-        cmb = ttk.Combobox(win, width=28, state="readonly", values=["(brak)"] + [str(s) for s in stores])
+        cmb = ttk.Combobox(win, width=28, state="readonly", values=emp_assign_cmb["values"])
         cmb.grid(row=3, column=1); cmb.set(str(e.store) if e.store else "(brak)")
 
         def _save():
             e.fullname, e.position = name_ent.get().strip(), pos_ent.get().strip()
             new_loc = loc_ent.get().strip()
-            new_store = stores[cmb.current() - 1] if cmb.current() > 0 else None
-            if e.store is not new_store:
-                if e.store: e.store.employees.remove(e)
-                if new_store: new_store.employees.append(e)
-                e.store = new_store
-            if new_loc != e.location:
-                e.location = new_loc; e.lat, e.lon = wikigeocode(new_loc)
-            refresh_emp_lb(); refresh_map(); win.destroy()
-
+            with repo.events.batch():
+                repo.assign(e, assigned_store(cmb))
+                if new_loc != e.location:
+                    e.location = new_loc
+                    geo.cancel_owner(e)
+                    geo.locate(e, new_loc, lookup=wikigeocode)
+                repo.update(e)
+            win.destroy()
+
+        loc_ent.bind("<FocusOut>", lambda *_: geo.prefetch(loc_ent.get().strip(), e.location, win))
+        geo.cancel_with(win)
         ttk.Button(win, text="Zapisz", command=_save).grid(row=4, columnspan=2, pady=6)
 
     # ── CRUD dostawców ────────────────────────────────
@@ -347,30 +462,23 @@ def launch_main_app() -> None:
         n, cat, loc = sup_name_ent.get().strip(), sup_cat_ent.get().strip(), sup_loc_ent.get().strip()
         if not n or not cat or not loc:
             return
-        idx = sup_assign_cmb.current() - 1
-        st = stores[idx] if idx >= 0 else None
-        s = Supplier(n, cat, loc, st)
-        suppliers.append(s)
-        if st: st.suppliers.append(s)
+        st = assigned_store(sup_assign_cmb)
+        s = Supplier(n, cat, loc, st, resolve=False)
+        repo.add(s)
+        if st is None: geo.locate(s, loc)
         for w in (sup_name_ent, sup_cat_ent, sup_loc_ent): w.delete(0, tk.END)
-        sup_assign_cmb.set("(brak)"); refresh_sup_lb(); refresh_map()
+        sup_assign_cmb.set("(brak)")
 
     def del_sup():
-        if not supplier_lb.curselection():
+        s = suppliers.get(supplier_lb.selected_id())
+        if s is None:
             return
-        flt, idx = sup_filter_cmb.get(), supplier_lb.curselection()[0]
-        s = suppliers.pop(idx) if flt == "– Wszystkie –" else (
-            next(st for st in stores if str(st) == flt).suppliers.pop(idx))
-        if s.marker: s.marker.delete()
-        if s in suppliers: suppliers.remove(s)
-        refresh_sup_lb(); refresh_map()
+        geo.cancel_owner(s); repo.remove(s)
 
     def edit_sup():
-        if not supplier_lb.curselection():
+        s = suppliers.get(supplier_lb.selected_id())
+        if s is None:
             return
-        flt, idx = sup_filter_cmb.get(), supplier_lb.curselection()[0]
-        s = suppliers[idx] if flt == "– Wszystkie –" else (
-            next(st for st in stores if str(st) == flt).suppliers[idx])
 
         win = tk.Toplevel(app); win.title("Edytuj dostawcę")
         for i, (lbl, val) in enumerate([("Nazwa:", s.name),
@@ -382,27 +490,76 @@ def launch_main_app() -> None:
             elif i == 1: cat_ent = ent
             else: loc_ent = ent
         ttk.Label(win, text="Sklep:").grid(row=3, column=0, sticky="e")
-        cmb = ttk.Combobox(win, width=28, state="readonly", values=["(brak)"] + [str(st) for st in stores])
+        cmb = ttk.Combobox(win, width=28, state="readonly", values=sup_assign_cmb["values"])
         cmb.grid(row=3, column=1); cmb.set(str(s.store) if s.store else "(brak)")
 
         def _save():
             s.name, s.category = name_ent.get().strip(), cat_ent.get().strip()
             new_loc = loc_ent.get().strip()
-            new_store = stores[cmb.current() - 1] if cmb.current() > 0 else None
-            if s.store is not new_store:
-                if s.store: s.store.suppliers.remove(s)
-                if new_store: new_store.suppliers.append(s)
-                s.store = new_store
-            if new_loc != s.location:
-                s.location = new_loc; s.lat, s.lon = wikigeocode(new_loc)
-            refresh_sup_lb(); refresh_map(); win.destroy()
-
+            with repo.events.batch():
+                repo.assign(s, assigned_store(cmb))
+                if new_loc != s.location:
+                    s.location = new_loc
+                    geo.cancel_owner(s)
+                    geo.locate(s, new_loc, lookup=wikigeocode)
+                repo.update(s)
+            win.destroy()
+
+        loc_ent.bind("<FocusOut>", lambda *_: geo.prefetch(loc_ent.get().strip(), s.location, win))
+        geo.cancel_with(win)
         ttk.Button(win, text="Zapisz", command=_save).grid(row=4, columnspan=2, pady=6)
 
+    # ── najbliższy sklep ───────────────────────────────
+    def nearest_store(lb: VirtualList, table: dict):
+        "zaznaczony pracownik/dostawca → najbliższy sklep"
+        ent = table.get(lb.selected_id())
+        if ent is None:
+            return
+        hit = repo.nearest(ent)
+        if not hit:
+            messagebox.showinfo("Najbliższy sklep", "Brak sklepów albo lokalizacja nie jest jeszcze znana.")
+            return
+        with repo.events.batch():
+            repo.assign(ent, hit[0][0]); repo.update(ent)
+
+    def nearest_store_all(table: dict):
+        "wszyscy bez sklepu – jedno zapytanie hurtowe i jeden zapis"
+        changed = repo.assign_nearest([e for e in table.values() if e.store is None])
+        messagebox.showinfo("Najbliższy sklep", f"Przypisano: {len(changed)}")
+
+    # ── pokrycie sklepów dostawcami ────────────────────
+    coverage = CoverageReport()        # wynik pamiętany – kolejne otwarcia liczą tylko zmiany
+
+    def coverage_window():
+        radius = simpledialog.askfloat("Raport pokrycia", "Promień [km]:", parent=app,
+                                       initialvalue=coverage.radius_km, minvalue=0.1)
+        if radius is None:
+            return
+        coverage.set_radius(radius)
+        coverage.sync(((k, st.lat, st.lon) for k, st in stores.items()),
+                      ((k, s.lat, s.lon, s.category) for k, s in suppliers.items()))
+        win = tk.Toplevel(app); win.title(f"Dostawcy w promieniu {radius:g} km")
+        tree = ttk.Treeview(win, columns=("total", "cats"), height=20)
+        tree.heading("#0", text="Sklep"); tree.heading("total", text="Dostawcy")
+        tree.heading("cats", text="Wg kategorii")
+        tree.column("#0", width=320); tree.column("total", width=80, anchor="e"); tree.column("cats", width=420)
+        for sid, total, cats in coverage.table():
+            tree.insert("", tk.END, text=str(stores[sid]),
+                        values=(total, ", ".join(f"{c}: {n}" for c, n in cats.most_common())))
+        tree.pack(fill="both", expand=True)
+
+        def _export():
+            path = filedialog.asksaveasfilename(parent=win, defaultextension=".csv",
+                                                filetypes=[("CSV", "*.csv")])
+            if path:
+                coverage.to_csv(path, label=lambda sid: str(stores[sid]))
+        ttk.Button(win, text="Eksport CSV…", command=_export).pack(pady=4)
+
     # ─────────  GUI  ─────────
     tabs = ttk.Notebook(app)
-    tab_s, tab_e, tab_sup, tab_m = (ttk.Frame(tabs) for _ in range(4))
-    for t, lbl in zip((tab_s, tab_e, tab_sup, tab_m), ("Sklepy", "Pracownicy", "Dostawcy", "Mapa")):
+    tab_s, tab_e, tab_sup, tab_m, tab_d = (ttk.Frame(tabs) for _ in range(5))
+    for t, lbl in zip((tab_s, tab_e, tab_sup, tab_m, tab_d),
+                      ("Sklepy", "Pracownicy", "Dostawcy", "Mapa", "Diagnostyka")):
         tabs.add(t, text=lbl)
     tabs.pack(expand=True, fill="both")
 
@@ -414,9 +571,11 @@ def launch_main_app() -> None:
     ttk.Label(frm_s, text="Adres (miasto, ul. nr):").grid(row=1, column=0, sticky="e")
     store_loc_ent = tk.Entry(frm_s, width=25); store_loc_ent.grid(row=1, column=1)
     ttk.Button(frm_s, text="Dodaj", command=add_store).grid(row=2, columnspan=2, pady=3)
-    store_lb = tk.Listbox(tab_s, width=50, height=12); store_lb.pack(pady=6)
+    store_lb = VirtualList(tab_s, label=lambda i: str(stores[i]), width=50, height=12); store_lb.pack(pady=6)
     ttk.Button(tab_s, text="Usuń",  command=del_store).pack(pady=2)
     ttk.Button(tab_s, text="Edytuj", command=edit_store).pack()
+    ttk.Button(tab_s, text="Importuj CSV/JSONL…", command=import_data).pack(pady=6)
+    import_status = ttk.Label(tab_s, text=""); import_status.pack()
 
     # Pracownicy
     ttk.Label(tab_e, text="Pracownicy", font=("Arial", 14)).pack(pady=8)
@@ -431,11 +590,20 @@ def launch_main_app() -> None:
     emp_assign_cmb = ttk.Combobox(frm_e, width=23, state="readonly"); emp_assign_cmb.grid(row=3, column=1)
     emp_assign_cmb.set("(brak)")
     ttk.Button(frm_e, text="Dodaj", command=add_emp).grid(row=4, columnspan=2, pady=3)
-    emp_filter_cmb = ttk.Combobox(tab_e, width=40, state="readonly"); emp_filter_cmb.pack(pady=3)
-    emp_filter_cmb.set("– Wszystkie –"); emp_filter_cmb.bind("<<ComboboxSelected>>", lambda *_: refresh_emp_lb())
-    employee_lb = tk.Listbox(tab_e, width=60, height=12); employee_lb.pack()
+    frm_ef = ttk.Frame(tab_e); frm_ef.pack(pady=3)
+    emp_filter_cmb = ttk.Combobox(frm_ef, width=40, state="readonly"); emp_filter_cmb.pack(side="left")
+    emp_filter_cmb.set("– Wszystkie –"); emp_filter_cmb.bind("<<ComboboxSelected>>", lambda *_: refresh.invalidate("employee"))
+    ttk.Label(frm_ef, text="Szukaj:").pack(side="left", padx=(8, 2))
+    emp_query = tk.StringVar(); emp_query.trace_add("write", lambda *_: on_query("employee"))
+    ttk.Entry(frm_ef, textvariable=emp_query, width=20).pack(side="left")
+    employee_lb = VirtualList(tab_e, label=lambda i: str(employees[i]), width=60, height=12); employee_lb.pack()
     ttk.Button(tab_e, text="Usuń",  command=del_emp).pack(pady=2)
     ttk.Button(tab_e, text="Edytuj", command=edit_emp).pack()
+    frm_en = ttk.Frame(tab_e); frm_en.pack(pady=4)
+    ttk.Button(frm_en, text="Najbliższy sklep",
+               command=lambda: nearest_store(employee_lb, employees)).pack(side="left", padx=2)
+    ttk.Button(frm_en, text="Najbliższy sklep – wszyscy bez sklepu",
+               command=lambda: nearest_store_all(employees)).pack(side="left", padx=2)
 
     # Dostawcy
     ttk.Label(tab_sup, text="Dostawcy", font=("Arial", 14)).pack(pady=8)
@@ -450,11 +618,21 @@ def launch_main_app() -> None:
     sup_assign_cmb = ttk.Combobox(frm_sup, width=23, state="readonly"); sup_assign_cmb.grid(row=3, column=1)
     sup_assign_cmb.set("(brak)")
     ttk.Button(frm_sup, text="Dodaj", command=add_sup).grid(row=4, columnspan=2, pady=3)
-    sup_filter_cmb = ttk.Combobox(tab_sup, width=40, state="readonly"); sup_filter_cmb.pack(pady=3)
-    sup_filter_cmb.set("– Wszystkie –"); sup_filter_cmb.bind("<<ComboboxSelected>>", lambda *_: refresh_sup_lb())
-    supplier_lb = tk.Listbox(tab_sup, width=60, height=12); supplier_lb.pack()
+    frm_sf = ttk.Frame(tab_sup); frm_sf.pack(pady=3)
+    sup_filter_cmb = ttk.Combobox(frm_sf, width=40, state="readonly"); sup_filter_cmb.pack(side="left")
+    sup_filter_cmb.set("– Wszystkie –"); sup_filter_cmb.bind("<<ComboboxSelected>>", lambda *_: refresh.invalidate("supplier"))
+    ttk.Label(frm_sf, text="Szukaj:").pack(side="left", padx=(8, 2))
+    sup_query = tk.StringVar(); sup_query.trace_add("write", lambda *_: on_query("supplier"))
+    ttk.Entry(frm_sf, textvariable=sup_query, width=20).pack(side="left")
+    supplier_lb = VirtualList(tab_sup, label=lambda i: str(suppliers[i]), width=60, height=12); supplier_lb.pack()
     ttk.Button(tab_sup, text="Usuń",  command=del_sup).pack(pady=2)
     ttk.Button(tab_sup, text="Edytuj", command=edit_sup).pack()
+    frm_sn = ttk.Frame(tab_sup); frm_sn.pack(pady=4)
+    ttk.Button(frm_sn, text="Najbliższy sklep",
+               command=lambda: nearest_store(supplier_lb, suppliers)).pack(side="left", padx=2)
+    ttk.Button(frm_sn, text="Najbliższy sklep – wszyscy bez sklepu",
+               command=lambda: nearest_store_all(suppliers)).pack(side="left", padx=2)
+    ttk.Button(tab_sup, text="Raport pokrycia…", command=coverage_window).pack(pady=2)
 
     # Mapa
     ttk.Label(tab_m, text="Mapa", font=("Arial", 14)).pack(pady=6)
@@ -466,17 +644,91 @@ def launch_main_app() -> None:
                                         "Dostawcy – cała sieć",])
     map_view_cmb.grid(row=0, column=1); map_view_cmb.current(0)
     map_view_cmb.bind("<<ComboboxSelected>>", refresh_map)
+    ttk.Button(top_m, text="Geokoduj ponownie", command=regeocode_all).grid(row=0, column=2, padx=6)
     map_w = tkintermapview.TkinterMapView(tab_m, width=1180, height=520, corner_radius=0)
     map_w.pack(); map_w.set_position(*PL_CENTER); map_w.set_zoom(6)
+    markers = MarkerManager(map_w, on_click=zoom_into)
+    for seq in ("<B1-Motion>", "<ButtonRelease-1>", "<MouseWheel>", "<Button-4>", "<Button-5>"):
+        map_w.canvas.bind(seq, on_map_move, add="+")
+
+    # Diagnostyka – czasy gorących ścieżek (metrics), odświeżane co sekundę, gdy zakładka jest widoczna
+    ttk.Label(tab_d, text="Diagnostyka", font=("Arial", 14)).pack(pady=6)
+    top_d = ttk.Frame(tab_d); top_d.pack()
+    metrics_on = tk.BooleanVar(value=metrics.enabled)
+    ttk.Checkbutton(top_d, text="Pomiar włączony", variable=metrics_on,
+                    command=lambda: metrics.enable(metrics_on.get())).grid(row=0, column=0, padx=6)
+    ttk.Button(top_d, text="Zeruj", command=lambda: (metrics.reset(), show_metrics())).grid(row=0, column=1, padx=6)
+    ttk.Button(top_d, text="Zapisz metryki…", command=lambda: save_metrics()).grid(row=0, column=2, padx=6)
+    cols = ("count", "p50", "p95", "p99", "max", "in_flight")
+    metrics_tv = ttk.Treeview(tab_d, columns=cols, height=14)
+    metrics_tv.heading("#0", text="ścieżka"); metrics_tv.column("#0", width=220)
+    for c, lbl in zip(cols, ("wywołań", "p50 [ms]", "p95 [ms]", "p99 [ms]", "max [ms]", "w toku")):
+        metrics_tv.heading(c, text=lbl); metrics_tv.column(c, width=100, anchor="e")
+    metrics_tv.pack(pady=6)
+    sources_lbl = ttk.Label(tab_d, text="", justify="left", font=("Courier", 10)); sources_lbl.pack(anchor="w", padx=20)
+
+    def show_metrics():
+        snap = metrics.snapshot()
+        metrics_tv.delete(*metrics_tv.get_children())
+        for name, t in snap["timings"].items():
+            metrics_tv.insert("", "end", text=name, values=(
+                t["count"], f"{t['p50_ms']:.2f}", f"{t['p95_ms']:.2f}", f"{t['p99_ms']:.2f}",
+                f"{t['max_ms']:.2f}", t["in_flight"]))
+        gc = snap["sources"]["geocache"]
+        lines = [f"geocache: trafienia {gc['hit_rate']:.0%} (z braków {gc['negative_hits']}), "
+                 f"chybienia {gc['misses']}; w kolejce geokodowania: {snap['sources']['geocode_queue']['in_flight']}"]
+        for chain in ("locate_chain", "wiki_chain"):
+            lines += [f"{chain}.{name}: {s['calls']} zapytań, {s['hit_rate']:.0%} trafień, "
+                      f"{s['errors']} błędów, {s['avg_ms']:.1f} ms" for name, s in snap["sources"][chain].items()]
+        sources_lbl.config(text="\n".join(lines))
+
+    def metrics_tick():
+        if tabs.select() == str(tab_d):
+            show_metrics()
+        app.after(1000, metrics_tick)
+
+    def save_metrics():
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if path:
+            metrics.dump(path)
 
     # inicjalizacja
-    store_lb.bind("<<ListboxSelect>>", lambda *_: refresh_map())
     for lb, func in [(store_lb, edit_store), (employee_lb, edit_emp), (supplier_lb, edit_sup)]:
-        lb.bind("<Double-1>", lambda e, f=func: f())
+        lb.on_double(func)
+
+    # widoczna zakładka odświeżana w najbliższej klatce, ukryte – dopiero przy pokazaniu
+    def on_tab(tab):
+        return lambda: tabs.select() == str(tab)
+
+    refresh.register("combos", lambda _: sync_store_combos(), sync_store_combos)   # może unieważnić listy
+    refresh.register("store", patch_stores, refresh_store_lb, on_tab(tab_s), priority=1)
+    refresh.register("employee", lambda ch: employee_lb.apply(ch, listed), refresh_emp_lb,
+                     on_tab(tab_e), priority=1)
+    refresh.register("supplier", lambda ch: supplier_lb.apply(ch, listed), refresh_sup_lb,
+                     on_tab(tab_sup), priority=1)
+    refresh.register("map", patch_map, refresh_map, on_tab(tab_m), priority=2)
+    repo.events.subscribe(lambda ch: (refresh.push("store", ch), refresh.push("combos", ch)), kinds=("store",))
+    repo.events.subscribe(lambda ch: refresh.push("employee", ch), kinds=("employee",))
+    repo.events.subscribe(lambda ch: refresh.push("supplier", ch), kinds=("supplier",))
+    repo.events.subscribe(map_changes)
+    tabs.bind("<<NotebookTabChanged>>", lambda *_: refresh.show())
 
     sync_store_combos()
     refresh_store_lb(); refresh_emp_lb(); refresh_sup_lb(); refresh_map()
+
+    def relocate_pending():
+        "encje zapisane w trakcie geokodowania – dokańczamy w tle"
+        relocate(e for lst in (employees, suppliers) for e in lst.values() if e.pending)
+
+    startup = [relocate_pending]
+    if VERIFY_PRESETS:      # opcjonalnie – marker przesunie się w miejscu po repo.update
+        startup.insert(0, lambda: verify_presets(geo, repo, PRESET_STORES))
+    after_first_window(app, t_start, *startup)
+    app.after(1000, metrics_tick)
     app.mainloop()
+    if metrics.DUMP_PATH:
+        metrics.dump(metrics.DUMP_PATH)
+    geo.close(); db.close()
 
 # ─────────  OKNO LOGOWANIA  ─────────
 
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from typing import Callable, Hashable, Iterable
+
+import metrics
+
+# (klucz, lat, lon, etykieta, kolor)
+MarkerSpec = tuple[Hashable, float, float, str, str]
+
+
+class MarkerManager:
+    """Markery na mapie trzymane per encja.
+
+    ``sync`` porównuje żądany widok z tym, co już jest na mapie, i tworzy,
+    przesuwa, przemianowuje albo usuwa tylko zmienione markery. Kluczem jest
+    zwykle sama encja (Store/Employee/Supplier); markery zna tylko menedżer.
+    ``on_click(klucz)`` – opcjonalnie, kliknięcie markera.
+    """
+
+    def __init__(self, map_w, on_click: Callable[[Hashable], None] | None = None):
+        self.map_w, self.on_click = map_w, on_click
+        self._shown: dict[Hashable, list] = {}      # klucz → [marker, lat, lon, tekst, kolor]
+
+    def __len__(self) -> int:
+        return len(self._shown)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._shown
+
+    def positions(self) -> list[tuple[float, float]]:
+        return [(e[1], e[2]) for e in self._shown.values()]
+
+    def position(self, key: Hashable) -> tuple[float, float]:
+        entry = self._shown[key]
+        return entry[1], entry[2]
+
+    def sync(self, specs: Iterable[MarkerSpec]) -> tuple[int, int, int]:
+        "zwraca (utworzone, zmienione, usunięte)"
+        wanted = {key: (lat, lon, text, color) for key, lat, lon, text, color in specs}
+        gone = [k for k in self._shown if k not in wanted]
+        self._drop(gone)
+        created = changed = 0
+        for key, spec in wanted.items():
+            entry = self._shown.get(key)
+            if entry is None:
+                self.upsert(key, *spec); created += 1
+            elif (entry[1], entry[2], entry[3], entry[4]) != spec:
+                self.upsert(key, *spec); changed += 1
+        return created, changed, len(gone)
+
+    def upsert(self, key: Hashable, lat: float, lon: float, text: str, color: str) -> None:
+        "pojedyncza zmiana – bez przeglądania reszty widoku"
+        entry = self._shown.get(key)
+        if entry is not None and entry[4] != color:
+            self._drop([key]); entry = None
+        if entry is None:
+            command = (lambda _, key=key: self.on_click(key)) if self.on_click else None
+            with metrics.timer("set_marker"):
+                marker = self.map_w.set_marker(lat, lon, text=text, marker_color_outside=color,
+                                               command=command)
+            self._shown[key] = [marker, lat, lon, text, color]
+            return
+        marker = entry[0]
+        if (entry[1], entry[2]) != (lat, lon):
+            marker.position = (lat, lon); entry[1], entry[2] = lat, lon
+        if entry[3] != text:
+            marker.text = text; entry[3] = text
+        marker.draw()
+
+    def discard(self, key: Hashable) -> None:
+        if key in self._shown:
+            self._drop([key])
+
+    def clear(self) -> None:
+        self._drop(list(self._shown))
+
+    def _drop(self, keys: list[Hashable]) -> None:
+        # CanvasPositionMarker.delete() robi list.remove + canvas.update() dla każdego
+        # markera; przy tysiącach to O(n²) – usuwamy elementy canvasu hurtem
+        if not keys:
+            return
+        canvas = self.map_w.canvas
+        dropped = set()
+        for key in keys:
+            marker = self._shown.pop(key)[0]
+            dropped.add(id(marker))
+            for item in (marker.polygon, marker.big_circle, marker.canvas_text,
+                         marker.canvas_icon, marker.canvas_image):
+                if item is not None:
+                    canvas.delete(item)
+            marker.polygon = marker.big_circle = marker.canvas_text = None
+            marker.canvas_icon = marker.canvas_image = None
+            marker.deleted = True
+        self.map_w.canvas_marker_list = [m for m in self.map_w.canvas_marker_list
+                                         if id(m) not in dropped]
@@ -0,0 +1,140 @@
+"""Lekkie pomiary gorących ścieżek: histogramy czasów, liczba wywołań w toku,
+statystyki z innych modułów (cache, źródła geokodowania, kolejka).
+
+Domyślnie wyłączone – ``timed``/``timer`` sprawdzają wtedy jedną zmienną
+modułu i nic nie mierzą. Włączenie: ``enable()`` (zakładka Diagnostyka)
+albo zmienna środowiskowa ``SIEC_METRICS=<plik.json>`` – wtedy pomiar od
+startu i zrzut do pliku przy wyjściu z aplikacji.
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+from collections.abc import Callable
+from functools import wraps
+
+MIN_S = 1e-6                    # dolna granica histogramu (1 µs)
+STEPS_PER_OCTAVE = 8            # kubełki co ~9% – tyle wynosi błąd percentyla
+BUCKETS = 30 * STEPS_PER_OCTAVE  # do ~18 min
+
+DUMP_PATH = os.environ.get("SIEC_METRICS")
+enabled = bool(DUMP_PATH)
+
+_lock = threading.Lock()
+_hists: dict[str, Histogram] = {}
+_inflight: dict[str, int] = {}
+_sources: dict[str, Callable[[], dict]] = {}
+_NULL = contextlib.nullcontext()
+
+
+class Histogram:
+    "czasy w kubełkach logarytmicznych – stała pamięć, percentyle z dokładnością kubełka"
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count, self.total, self.max = 0, 0.0, 0.0
+
+    def record(self, seconds: float) -> None:
+        i = 0 if seconds <= MIN_S else min(BUCKETS - 1, int(math.log2(seconds / MIN_S) * STEPS_PER_OCTAVE))
+        self.counts[i] += 1
+        self.count += 1; self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        "górna granica kubełka, w którym wypada q (0–1); nie więcej niż maksimum"
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self.max, MIN_S * 2 ** ((i + 1) / STEPS_PER_OCTAVE))
+        return self.max
+
+
+# ── pomiar ─────────────────────────────────────────────
+def enable(on: bool = True) -> None:
+    global enabled
+    enabled = on
+
+
+def record(name: str, seconds: float) -> None:
+    with _lock:
+        hist = _hists.get(name)
+        if hist is None:
+            hist = _hists[name] = Histogram()
+        hist.record(seconds)
+
+
+class _Timer:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        with _lock:
+            _inflight[self.name] = _inflight.get(self.name, 0) + 1
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.t0
+        with _lock:
+            _inflight[self.name] -= 1
+        record(self.name, seconds)
+        return False
+
+
+def timer(name: str):
+    "``with timer('set_marker'): ...`` – przy wyłączonym pomiarze pusty kontekst"
+    return _Timer(name) if enabled else _NULL
+
+
+def timed(name: str) -> Callable:
+    "dekorator: czas i liczba wywołań w toku pod nazwą ``name``"
+    def deco(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            with _Timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def source(name: str, stats: Callable[[], dict]) -> None:
+    "statystyki z zewnątrz (np. trafienia cache), zbierane dopiero w ``snapshot``"
+    _sources[name] = stats
+
+
+# ── odczyt ─────────────────────────────────────────────
+def snapshot() -> dict:
+    with _lock:
+        timings = {name: {"count": h.count,
+                          "mean_ms": 1000 * h.total / h.count if h.count else 0.0,
+                          "p50_ms": 1000 * h.percentile(0.50),
+                          "p95_ms": 1000 * h.percentile(0.95),
+                          "p99_ms": 1000 * h.percentile(0.99),
+                          "max_ms": 1000 * h.max,
+                          "in_flight": _inflight.get(name, 0)}
+                   for name, h in sorted(_hists.items())}
+    return {"enabled": enabled, "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "timings": timings, "sources": {name: fn() for name, fn in _sources.items()}}
+
+
+def dump(path: str) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(snapshot(), fh, indent=2, ensure_ascii=False)
+
+
+def reset() -> None:
+    with _lock:
+        _hists.clear()
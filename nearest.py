@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import heapq
+import math
+from collections.abc import Hashable, Iterable, Sequence
+
+EARTH_KM = 6371.0088
+CELL_KM = 25.0                  # krawędź komórki siatki (≈ odległość między sąsiednimi sklepami)
+BLOCK = 4096                    # tyle zapytań naraz w mnożeniu macierzy – pamięć ograniczona
+
+
+def unit(lat: float, lon: float) -> tuple[float, float, float]:
+    "punkt na sferze jednostkowej – odległość cięciwy rośnie razem z odległością po wielkim kole"
+    la, lo = math.radians(lat), math.radians(lon)
+    c = math.cos(la)
+    return c * math.cos(lo), c * math.sin(lo), math.sin(la)
+
+
+def chord_km(chord: float) -> float:
+    return 2 * EARTH_KM * math.asin(min(1.0, chord / 2))
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class NearestStores:
+    """Najbliższe sklepy (odległość po powierzchni Ziemi).
+
+    Sklepy leżą w siatce 3D nad punktami na sferze jednostkowej (komórka
+    ``cell_km``); najbliższy po cięciwie = najbliższy po haversine. Szukanie
+    zaczyna od sąsiednich komórek i poszerza pierścień tylko, gdy trzeba,
+    więc koszt zależy od gęstości sklepów, a nie od ich liczby. ``add``,
+    ``remove`` i przesunięcie (ponowne ``add``) zmieniają jedną komórkę.
+
+    ``nearest_many`` (hurtowo) grupuje zapytania po komórkach i liczy
+    odległości mnożeniem macierzy w NumPy; bez NumPy – pętla po ``nearest``.
+    """
+
+    def __init__(self, cell_km: float = CELL_KM):
+        self.h = cell_km / EARTH_KM
+        self.points: dict[Hashable, tuple[float, float, float]] = {}
+        self._cells: dict[tuple[int, int, int], dict[Hashable, None]] = {}
+        self._arrays = None             # pamięć podręczna dla nearest_many, kasowana przy zmianach
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _cell(self, p: Sequence[float]) -> tuple[int, int, int]:
+        return int(math.floor(p[0] / self.h)), int(math.floor(p[1] / self.h)), int(math.floor(p[2] / self.h))
+
+    # ── zmiany ─────────────────────────────────────────
+    def add(self, key: Hashable, lat: float, lon: float) -> None:
+        "nowy sklep albo przesunięcie istniejącego"
+        self.remove(key)
+        p = unit(lat, lon)
+        self.points[key] = p
+        self._cells.setdefault(self._cell(p), {})[key] = None
+        self._arrays = None
+
+    def remove(self, key: Hashable) -> None:
+        p = self.points.pop(key, None)
+        if p is None:
+            return
+        cell = self._cell(p)
+        bucket = self._cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self._cells[cell]
+        self._arrays = None
+
+    # ── zapytania ──────────────────────────────────────
+    def nearest(self, lat: float, lon: float, k: int = 1) -> list[tuple[Hashable, float]]:
+        "k najbliższych sklepów: [(klucz, km)], od najbliższego"
+        if not self.points:
+            return []
+        q = unit(lat, lon)
+        c = self._cell(q)
+        k = min(k, len(self.points))
+        radius = 1
+        while True:
+            cand = self._within(c, radius)
+            if len(cand) >= k:
+                best = heapq.nsmallest(k, ((math.dist(q, self.points[key]), key) for key in cand))
+                need = int(best[-1][0] / self.h) + 1
+                if need > radius:
+                    # w dalszym pierścieniu może leżeć coś bliżej niż k-ty kandydat
+                    cand = self._within(c, need)
+                    best = heapq.nsmallest(k, ((math.dist(q, self.points[key]), key) for key in cand))
+                return [(key, chord_km(d)) for d, key in best]
+            radius *= 2
+
+    def _within(self, c: tuple[int, int, int], radius: int) -> list[Hashable]:
+        "klucze z komórek w odległości (Czebyszewa) ≤ radius od c"
+        if (2 * radius + 1) ** 3 > len(self._cells):
+            cells = [cell for cell in self._cells
+                     if max(abs(cell[0] - c[0]), abs(cell[1] - c[1]), abs(cell[2] - c[2])) <= radius]
+        else:
+            cells = [cell for cell in ((c[0] + dx, c[1] + dy, c[2] + dz)
+                                       for dx in range(-radius, radius + 1)
+                                       for dy in range(-radius, radius + 1)
+                                       for dz in range(-radius, radius + 1)) if cell in self._cells]
+        return [key for cell in cells for key in self._cells[cell]]
+
+    def nearest_many(self, coords: Iterable[tuple[float, float]]) -> list[tuple[Hashable, float] | None]:
+        "najbliższy sklep dla każdego punktu (lista albo tablica (n, 2); kolejność jak na wejściu)"
+        if not hasattr(coords, "__len__"):
+            coords = list(coords)
+        if not self.points:
+            return [None] * len(coords)
+        try:
+            import numpy as np
+        except ImportError:
+            return [self.nearest(lat, lon)[0] for lat, lon in coords]
+        return self._nearest_np(np, coords)
+
+    def _groups(self, np, xyz):
+        "punkty pogrupowane po komórkach: (komórki (u, 3), kolejność wierszy, granice grup)"
+        cells = np.floor(xyz / self.h).astype(np.int64)
+        # jedna liczba na komórkę – sortowanie int64 zamiast leksykograficznego po wierszach
+        off = int(1 / self.h) + 2
+        codes = ((cells[:, 0] + off) * (2 * off) + cells[:, 1] + off) * (2 * off) + cells[:, 2] + off
+        order = np.argsort(codes, kind="stable")
+        starts = np.flatnonzero(np.diff(codes[order], prepend=-1))
+        bounds = np.append(starts, len(order))
+        return cells[order[starts]], order, bounds
+
+    def _nearest_np(self, np, coords) -> list[tuple[Hashable, float]]:
+        if self._arrays is None:
+            keys = list(self.points)
+            xyz = np.array([self.points[k] for k in keys])
+            self._arrays = (keys, xyz, *self._groups(np, xyz))
+        keys, xyz, uniq, order, bounds = self._arrays
+
+        ll = np.radians(np.asarray(coords, dtype=float).reshape(-1, 2))
+        cos_lat = np.cos(ll[:, 0])
+        q = np.column_stack((cos_lat * np.cos(ll[:, 1]), cos_lat * np.sin(ll[:, 1]), np.sin(ll[:, 0])))
+        qcells, qorder, qbounds = self._groups(np, q)
+
+        best_idx = np.empty(len(q), dtype=np.int64)
+        best_dot = np.empty(len(q))
+
+        def candidates(c, radius: int):
+            near = np.flatnonzero(np.abs(uniq - c).max(axis=1) <= radius)
+            return np.concatenate([order[bounds[i]:bounds[i + 1]] for i in near]) if len(near) else None
+
+        for g in range(len(qcells)):
+            rows = qorder[qbounds[g]:qbounds[g + 1]]
+            c, radius = qcells[g], 1
+            while (cand := candidates(c, radius)) is None:
+                radius *= 2
+            for attempt in range(2):
+                for s in range(0, len(rows), BLOCK):
+                    part = rows[s:s + BLOCK]
+                    dots = q[part] @ xyz[cand].T           # cos kąta – największy = najbliższy
+                    arg = dots.argmax(axis=1)
+                    best_idx[part] = cand[arg]
+                    best_dot[part] = dots[np.arange(len(part)), arg]
+                worst = math.sqrt(max(0.0, 2 - 2 * float(best_dot[rows].min())))
+                need = int(worst / self.h) + 1
+                if attempt or need <= radius:
+                    break
+                cand, radius = candidates(c, need), need
+        km = 2 * EARTH_KM * np.arcsin(np.minimum(1.0, np.sqrt(np.maximum(0.0, 2 - 2 * best_dot)) / 2))
+        return [(keys[i], d) for i, d in zip(best_idx.tolist(), km.tolist())]
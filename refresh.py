@@ -0,0 +1,100 @@
+"""Odświeżanie widoków sklejane do najwyżej jednego na klatkę.
+
+Zmiany (``events.Change``) nie są stosowane od razu: ``push`` dopisuje je
+do widoku i oznacza go jako brudny, a ``flush`` – zaplanowany przez
+``after_idle``/``after`` nie częściej niż co ``FRAME_MS`` – poprawia
+widoczne widoki jedną partią, w kolejności priorytetu. Niewidoczne
+czekają na ``show`` (np. zmiana zakładki). Dwadzieścia wyników
+geokodowania w jednej klatce to jedno przerysowanie mapy, nie dwadzieścia.
+"""
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+
+import metrics
+
+FRAME_MS = 16                   # ~60 klatek/s
+MAX_PENDING = 2000              # przy dłuższej zaległości przebudowa od zera jest tańsza niż poprawki
+
+
+class _View:
+    __slots__ = ("name", "patch", "full", "visible", "priority", "pending", "stale")
+
+    def __init__(self, name, patch, full, visible, priority):
+        self.name, self.patch, self.full, self.visible, self.priority = name, patch, full, visible, priority
+        self.pending: list = []
+        self.stale = False              # wymagana pełna przebudowa
+
+
+class RefreshScheduler:
+    """``widget`` – dowolny widget Tk (``after``/``after_idle``/``after_cancel``).
+
+    Widok rejestruje ``patch(changes)``, ``full()`` i ``visible()``; niższy
+    ``priority`` odświeżany jest wcześniej.
+    """
+
+    def __init__(self, widget, frame_ms: int = FRAME_MS):
+        self.widget, self.frame_ms = widget, frame_ms
+        self._views: dict[str, _View] = {}
+        self._dirty: set[str] = set()
+        self._job = None
+        self._last = 0.0
+
+    def register(self, name: str, patch: Callable[[list], None], full: Callable[[], None],
+                 visible: Callable[[], bool] = lambda: True, priority: int = 0) -> None:
+        self._views[name] = _View(name, patch, full, visible, priority)
+
+    # ── oznaczanie ─────────────────────────────────────
+    def push(self, name: str, changes: list) -> None:
+        "zmiany do zastosowania przy najbliższym opróżnieniu"
+        view = self._views[name]
+        if not view.stale:
+            view.pending.extend(changes)
+            if len(view.pending) > MAX_PENDING:
+                view.stale, view.pending = True, []
+        self._mark(name)
+
+    def invalidate(self, name: str) -> None:
+        "pełna przebudowa zamiast poprawek (np. zmiana filtra)"
+        view = self._views[name]
+        view.stale, view.pending = True, []
+        self._mark(name)
+
+    def show(self) -> None:
+        "zmiana tego, co widać – zaległe widoki od razu, przed narysowaniem"
+        if self._dirty:
+            self.flush()
+
+    def _mark(self, name: str) -> None:
+        self._dirty.add(name)
+        if self._job is None:
+            wait = self._last + self.frame_ms / 1000 - time.perf_counter()
+            self._job = (self.widget.after(int(wait * 1000) + 1, self.flush) if wait > 0
+                         else self.widget.after_idle(self.flush))
+
+    # ── opróżnianie ────────────────────────────────────
+    @metrics.timed("refresh_flush")
+    def flush(self) -> None:
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+        self._last = time.perf_counter()
+        done: set[str] = set()
+        # widok może unieważnić inny (combo → lista), więc do skutku
+        while True:
+            ready = [v for v in self._views.values()
+                     if v.name in self._dirty and v.name not in done and v.visible()]
+            if not ready:
+                break
+            view = min(ready, key=lambda v: v.priority)
+            self._dirty.discard(view.name)
+            done.add(view.name)
+            changes, stale = view.pending, view.stale
+            view.pending, view.stale = [], False
+            if stale:
+                view.full()
+            elif changes:
+                view.patch(changes)
+        if any(self._views[n].visible() for n in self._dirty):
+            self._mark(next(iter(self._dirty)))     # unieważniony w trakcie – w następnej klatce
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import itertools
+from collections.abc import Iterable
+
+from events import ADDED, REASSIGNED, REMOVED, UPDATED, Change, EventBus
+from nearest import NearestStores
+from search import TextIndex
+
+# pola przeszukiwane w zakładkach Pracownicy/Dostawcy
+SEARCH_FIELDS = {
+    "employee": ("fullname", "position", "location"),
+    "supplier": ("name", "category", "location"),
+}
+
+
+class Repository:
+    """Encje sieci w pamięci, z indeksami po id.
+
+    ``stores``/``employees``/``suppliers`` to słowniki id → encja (kolejność
+    dodania), dodatkowo indeks etykiety sklepu (``str(store)``) → id. Sklep
+    trzyma swoich pracowników i dostawców w słownikach encja → None, więc
+    usunięcie i przepięcie do innego sklepu to O(1).
+
+    Jeśli podano ``storage``, każda zmiana jest od razu zapisywana, a id
+    nadaje baza; bez bazy id są ujemne, nadawane lokalnie.
+
+    ``search`` korzysta z indeksu tekstowego budowanego przy pierwszym
+    zapytaniu i potem aktualizowanego przy każdej zmianie; ``nearest``
+    z indeksu przestrzennego sklepów, aktualizowanego tak samo.
+
+    Każda zmiana jest publikowana w ``events`` (``events.Change``) – widoki
+    poprawiają tylko to, czego zmiana dotyczy.
+    """
+
+    def __init__(self, storage=None):
+        self.storage = storage
+        self.stores: dict[int, object] = {}
+        self.employees: dict[int, object] = {}
+        self.suppliers: dict[int, object] = {}
+        self._labels: dict[str, int] = {}
+        self._label_of: dict[int, str] = {}
+        self._ids = itertools.count(-1, -1)
+        self._text: dict[str, TextIndex] = {}
+        self._near = NearestStores()
+        self.events = EventBus()
+
+    def _table(self, entity) -> dict[int, object]:
+        return self._table_of(entity.kind)
+
+    def _table_of(self, kind: str) -> dict[int, object]:
+        return {"store": self.stores, "employee": self.employees, "supplier": self.suppliers}[kind]
+
+    # ── odczyt ─────────────────────────────────────────
+    def store_by_label(self, label: str):
+        sid = self._labels.get(label)
+        return None if sid is None else self.stores[sid]
+
+    def get(self, kind: str, ident: int):
+        return self._table_of(kind).get(ident)
+
+    def members(self, store, kind: str):
+        "pracownicy ('employee') albo dostawcy ('supplier') sklepu"
+        return store.employees if kind == "employee" else store.suppliers
+
+    def search(self, kind: str, query: str = "", store=None) -> list[int]:
+        "id pracowników/dostawców pasujących do zapytania i (opcjonalnie) sklepu, w kolejności dodania"
+        hits = self._text_index(kind).search(query) if query.strip() else None
+        if store is not None:
+            members = self.members(store, kind)
+            return [e.id for e in members if hits is None or e.id in hits]
+        if hits is None:
+            return list(self._table_of(kind))
+        if len(hits) * 8 < len(self._table_of(kind)):
+            # mały wynik – sortujemy go zamiast przeglądać całą tabelę
+            return sorted(hits, key=abs)
+        return [i for i in self._table_of(kind) if i in hits]
+
+    def nearest(self, entity, k: int = 1) -> list[tuple[object, float]]:
+        "k najbliższych sklepów encji: [(sklep, km)]"
+        if entity.lat is None:
+            return []
+        return [(self.stores[sid], km) for sid, km in self._near.nearest(entity.lat, entity.lon, k)]
+
+    def assign_nearest(self, entities: Iterable) -> list:
+        "przypisanie do najbliższego sklepu hurtem – jeden zapis; zwraca zmienione encje"
+        entities = [e for e in entities if e.lat is not None]
+        changed = []
+        with self.events.batch():
+            for ent, hit in zip(entities, self._near.nearest_many(self._coords(entities))):
+                if hit is not None and ent.store is not self.stores[hit[0]]:
+                    self.assign(ent, self.stores[hit[0]])
+                    changed.append(ent)
+            if changed and self.storage is not None:
+                self.storage.save_many(changed)
+        return changed
+
+    @staticmethod
+    def _coords(entities: list):
+        "współrzędne hurtem – z kolumn klasy (core.Coordinates), jeśli encje są jednej klasy"
+        cls = type(entities[0]) if entities else None
+        columns = getattr(cls, "coords", None)
+        if columns is not None and all(type(e) is cls for e in entities):
+            return columns.take([e._row for e in entities])
+        return [(e.lat, e.lon) for e in entities]
+
+    def matches(self, entity, query: str) -> bool:
+        "czy encja pasuje do zapytania – bez przeglądania całego indeksu"
+        return not query.strip() or self._text_index(entity.kind).matches(entity.id, query)
+
+    # ── zmiany ─────────────────────────────────────────
+    def add(self, entity, persist: bool = True) -> None:
+        self.add_many([entity], persist)
+
+    def add_many(self, entities: Iterable, persist: bool = True) -> None:
+        entities = list(entities)
+        if persist and self.storage is not None:
+            self.storage.save_many(entities)
+        for entity in entities:
+            if entity.id is None:
+                entity.id = next(self._ids)
+            self._table(entity)[entity.id] = entity
+            if entity.kind == "store":
+                self._relabel(entity)
+                self._place(entity)
+                continue
+            if entity.store is not None:
+                self.members(entity.store, entity.kind)[entity] = None
+            if entity.kind in self._text:
+                self._index(self._text[entity.kind], entity)
+        self.events.publish([Change(ADDED, e) for e in entities])
+
+    def update(self, entity) -> None:
+        "zapis po edycji; dla sklepu odświeża indeks etykiet"
+        if self.storage is not None:
+            self.storage.save(entity)
+        if entity.kind == "store":
+            self._relabel(entity)
+            self._place(entity)             # przesunięcie sklepu zmienia jedną komórkę indeksu
+        elif entity.kind in self._text:
+            self._index(self._text[entity.kind], entity)
+        self.events.publish([Change(UPDATED, entity)])
+
+    def update_many(self, entities: Iterable) -> None:
+        "jak update, ale jedna transakcja – np. po ponownym geokodowaniu"
+        entities = list(entities)
+        if self.storage is not None:
+            self.storage.save_many(entities)
+        for entity in entities:
+            if entity.kind == "store":
+                self._relabel(entity)
+                self._place(entity)
+            elif entity.kind in self._text:
+                self._index(self._text[entity.kind], entity)
+        self.events.publish([Change(UPDATED, e) for e in entities])
+
+    def assign(self, entity, store) -> None:
+        "przepięcie pracownika/dostawcy do innego sklepu (albo None)"
+        if entity.store is store:
+            return
+        old = entity.store
+        if old is not None:
+            self.members(old, entity.kind).pop(entity, None)
+        if store is not None:
+            self.members(store, entity.kind)[entity] = None
+        entity.store = store
+        self.events.publish([Change(REASSIGNED, entity, old)])
+
+    def remove(self, entity) -> list:
+        "usuwa encję; dla sklepu także jego pracowników i dostawców – zwraca wszystkie usunięte"
+        removed = [entity]
+        if entity.kind == "store":
+            removed += list(entity.employees) + list(entity.suppliers)
+            for member in removed[1:]:
+                self._table(member).pop(member.id, None)
+                if member.kind in self._text:
+                    self._text[member.kind].remove(member.id)
+            entity.employees.clear(); entity.suppliers.clear()
+            self._near.remove(entity.id)
+            label = self._label_of.pop(entity.id, None)
+            if label is not None and self._labels.get(label) == entity.id:
+                del self._labels[label]
+        else:
+            if entity.store is not None:
+                self.members(entity.store, entity.kind).pop(entity, None)
+            if entity.kind in self._text:
+                self._text[entity.kind].remove(entity.id)
+        self._table(entity).pop(entity.id, None)
+        changes = [Change(REMOVED, e) for e in removed]     # przed delete – baza zeruje id
+        if self.storage is not None and entity.id is not None and entity.id > 0:
+            self.storage.delete(entity)       # ON DELETE CASCADE usuwa resztę w bazie
+        self.events.publish(changes)
+        return removed
+
+    def _text_index(self, kind: str) -> TextIndex:
+        "indeks budowany dopiero przy pierwszym niepustym zapytaniu – nie spowalnia startu"
+        text = self._text.get(kind)
+        if text is None:
+            text = self._text[kind] = TextIndex()
+            fields = SEARCH_FIELDS[kind]
+            text.add_many((i, [getattr(e, f) for f in fields]) for i, e in self._table_of(kind).items())
+        return text
+
+    @staticmethod
+    def _index(text: TextIndex, entity) -> None:
+        text.add(entity.id, (getattr(entity, f) for f in SEARCH_FIELDS[entity.kind]))
+
+    def _place(self, store) -> None:
+        if store.lat is None:
+            self._near.remove(store.id)
+        else:
+            self._near.add(store.id, store.lat, store.lon)
+
+    def _relabel(self, store) -> None:
+        old = self._label_of.get(store.id)
+        if old is not None and self._labels.get(old) == store.id:
+            del self._labels[old]
+        label = str(store)
+        self._labels[label] = self._label_of[store.id] = store.id
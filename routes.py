@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable
+
+from nearest import haversine_km
+
+Coords = tuple[float, float]
+
+BUDGET_S = 1.0                  # domyślny limit czasu na poprawianie trasy
+NEIGHBOURS = 10                 # kandydaci ruchów 2-opt / Or-opt – najbliżsi sąsiedzi punktu
+CACHE_SIZE = 8                  # tyle macierzy odległości pamięta proces liczący
+
+_matrices: OrderedDict[tuple, tuple[list[list[float]], list[list[int]]]] = OrderedDict()
+
+
+# ── macierz odległości ─────────────────────────────────
+def distances(points: list[Coords]) -> tuple[list[list[float]], list[list[int]]]:
+    "macierz haversine [km] i listy najbliższych sąsiadów; ostatnie CACHE_SIZE pamiętane"
+    key = tuple((round(lat, 6), round(lon, 6)) for lat, lon in points)
+    hit = _matrices.get(key)
+    if hit is not None:
+        _matrices.move_to_end(key)
+        return hit
+    k = min(NEIGHBOURS, len(points) - 1)
+    try:
+        import numpy as np
+    except ImportError:
+        d = [[haversine_km(*p, *q) for q in points] for p in points]
+        neigh = [sorted((j for j in range(len(points)) if j != i), key=row.__getitem__)[:k]
+                 for i, row in enumerate(d)]
+    else:
+        ll = np.radians(np.array(points, dtype=float))
+        dlat = ll[:, None, 0] - ll[None, :, 0]
+        dlon = ll[:, None, 1] - ll[None, :, 1]
+        cos_lat = np.cos(ll[:, 0])
+        a = np.sin(dlat / 2) ** 2 + cos_lat[:, None] * cos_lat[None, :] * np.sin(dlon / 2) ** 2
+        m = 2 * 6371.0088 * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+        np.fill_diagonal(m, np.inf)
+        neigh = np.argsort(m, axis=1)[:, :k].tolist()
+        np.fill_diagonal(m, 0.0)
+        d = m.tolist()                   # listy – indeksowanie w pętlach Pythona jest szybsze niż w ndarray
+    _matrices[key] = (d, neigh)
+    if len(_matrices) > CACHE_SIZE:
+        _matrices.popitem(last=False)
+    return d, neigh
+
+
+# ── heurystyki ─────────────────────────────────────────
+def _nearest_neighbour(d: list[list[float]], neigh: list[list[int]]) -> list[int]:
+    n = len(d)
+    tour, seen = [0], [False] * n
+    seen[0] = True
+    for _ in range(n - 1):
+        last = tour[-1]
+        nxt = next((j for j in neigh[last] if not seen[j]), None)
+        if nxt is None:                  # wszyscy sąsiedzi odwiedzeni – pełne przejrzenie wiersza
+            row = d[last]
+            nxt = min((j for j in range(n) if not seen[j]), key=row.__getitem__)
+        tour.append(nxt); seen[nxt] = True
+    return tour
+
+
+def _reverse(tour: list[int], pos: list[int], i: int, j: int) -> None:
+    "odwrócenie cyklicznego odcinka tour[i..j]; krótszej strony – trasa ta sama"
+    n = len(tour)
+    length = (j - i) % n + 1
+    if 2 * length > n:
+        i, j, length = (j + 1) % n, (i - 1) % n, n - length
+    for _ in range(length // 2):
+        a, b = tour[i], tour[j]
+        tour[i], tour[j] = b, a
+        pos[b], pos[a] = i, j
+        i, j = (i + 1) % n, (j - 1) % n
+
+
+def _two_opt(tour: list[int], pos: list[int], d, neigh, deadline: float) -> bool:
+    n, improved = len(tour), False
+    for i in range(n):
+        if time.perf_counter() > deadline:
+            break
+        a, b = tour[i], tour[(i + 1) % n]
+        dab = d[a][b]
+        for c in neigh[a]:
+            dac = d[a][c]
+            if dac >= dab:
+                break                    # sąsiedzi posortowani – dalej już nie będzie zysku
+            j = pos[c]
+            e = tour[(j + 1) % n]
+            if c == b or e == a:
+                continue
+            if dac + d[b][e] - dab - d[c][e] < -1e-9:
+                _reverse(tour, pos, (i + 1) % n, j)
+                improved = True
+                break
+    return improved
+
+
+def _or_opt(tour: list[int], pos: list[int], d, neigh, deadline: float) -> bool:
+    "przeniesienie odcinka 1–3 punktów między innych sąsiadów (także odwróconego)"
+    n, improved = len(tour), False
+    for length in (1, 2, 3):
+        if n < length + 3:
+            break
+        i = 0
+        while i < n:
+            if time.perf_counter() > deadline:
+                return improved
+            seg = [tour[(i + k) % n] for k in range(length)]
+            p, nx = tour[(i - 1) % n], tour[(i + length) % n]
+            first, last = seg[0], seg[-1]
+            gain = d[p][first] + d[last][nx] - d[p][nx]
+            best = None
+            for end in (first, last):
+                for c in neigh[end]:
+                    if c in seg or c == p:
+                        continue
+                    e = tour[(pos[c] + 1) % n]
+                    if e in seg:
+                        continue
+                    fwd = d[c][first] + d[last][e] - d[c][e]
+                    rev = d[c][last] + d[first][e] - d[c][e]
+                    cost, rev_seg = (fwd, False) if fwd <= rev else (rev, True)
+                    if cost - gain < -1e-9 and (best is None or cost < best[0]):
+                        best = (cost, c, rev_seg)
+            if best is None:
+                i += 1
+                continue
+            _, c, rev_seg = best
+            rest = [v for v in tour if v not in seg]
+            at = rest.index(c) + 1
+            rest[at:at] = seg[::-1] if rev_seg else seg
+            tour[:] = rest
+            for k, v in enumerate(tour):
+                pos[v] = k
+            improved = True
+            i += 1
+    return improved
+
+
+def solve(points: list[Coords], budget_s: float = BUDGET_S) -> tuple[list[int], float]:
+    """Krótka pętla przez wszystkie punkty, start i koniec w ``points[0]`` (sklep).
+
+    Najbliższy sąsiad, potem naprzemiennie 2-opt i Or-opt ograniczone do
+    ``NEIGHBOURS`` najbliższych, aż do braku poprawy albo limitu czasu.
+    Zwraca (kolejność indeksów od 0, długość w km).
+    """
+    n = len(points)
+    if n <= 3:
+        order = list(range(n))
+    else:
+        deadline = time.perf_counter() + budget_s
+        d, neigh = distances(points)
+        tour = _nearest_neighbour(d, neigh)
+        pos = [0] * n
+        for k, v in enumerate(tour):
+            pos[v] = k
+        while time.perf_counter() < deadline:
+            changed = _two_opt(tour, pos, d, neigh, deadline)
+            changed = _or_opt(tour, pos, d, neigh, deadline) or changed
+            if not changed:
+                break
+        start = tour.index(0)
+        order = tour[start:] + tour[:start]
+    length = sum(haversine_km(*points[a], *points[b]) for a, b in zip(order, order[1:] + order[:1]))
+    return order, length
+
+
+# ── liczenie w osobnym procesie ────────────────────────
+class RoutePlanner:
+    """Trasy liczone w procesie roboczym – okno nie czeka na solver.
+
+    Nowe zlecenie unieważnia poprzednie (wynik starego nie dotrze do
+    callbacku). Wynik trafia przez ``dispatch`` – w aplikacji ``app.after``.
+    """
+
+    def __init__(self, dispatch: Callable[..., Any] | None = None):
+        self.dispatch = dispatch or (lambda fn, *args: fn(*args))
+        self._pool: ProcessPoolExecutor | None = None
+        self._latest: Future | None = None
+
+    def plan(self, depot: Coords, stops: list[Coords],
+             callback: Callable[[list[int], float], None], budget_s: float = BUDGET_S) -> Future:
+        "callback(kolejność przystanków (indeksy w stops), km) – w kolejności od sklepu"
+        if self._pool is None:
+            # spawn – fork procesu z Tk bywa niestabilny
+            self._pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        if self._latest is not None:
+            self._latest.cancel()
+        fut = self._pool.submit(solve, [depot, *stops], budget_s)
+        self._latest = fut
+        fut.add_done_callback(lambda f: self.dispatch(self._deliver, f, callback))
+        return fut
+
+    def _deliver(self, fut: Future, callback) -> None:
+        if fut is not self._latest or fut.cancelled() or fut.exception() is not None:
+            return
+        order, km = fut.result()
+        callback([i - 1 for i in order[1:]], km)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import functools
+import unicodedata
+from collections.abc import Hashable, Iterable
+
+
+@functools.lru_cache(maxsize=65536)       # lokalizacje i stanowiska mocno się powtarzają
+def fold(text: str) -> str:
+    "małe litery bez polskich znaków – 'Łódź' i 'lodz' to to samo"
+    text = unicodedata.normalize("NFKD", text.casefold().replace("ł", "l"))
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _grams(value: str) -> set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class TextIndex:
+    """Wyszukiwanie po polach tekstowych: trigramy + prefiksy słów.
+
+    Indeksowane są *różne wartości* pól (wiele osób ma tę samą lokalizację
+    czy stanowisko), a każda wartość wskazuje zbiór id encji. Słowo zapytania
+    od 3 znaków szuka podciągu (kandydaci z najrzadszego trigramu, potem sprawdzenie),
+    krótsze – początku słowa. Kilka słów = koniunkcja.
+    """
+
+    def __init__(self):
+        self._fields: dict[Hashable, tuple[str, ...]] = {}        # id → znormalizowane wartości
+        self._ids: dict[str, set[Hashable]] = {}                  # wartość → id
+        self._grams: dict[str, set[str]] = {}                     # trigram → wartości
+        self._prefixes: dict[str, set[str]] = {}                  # 1–2 znaki początku słowa → wartości
+        self._last: tuple[list[str], set[Hashable]] | None = None
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    # ── zmiany ─────────────────────────────────────────
+    def add(self, key: Hashable, values: Iterable[str]) -> None:
+        values = tuple(dict.fromkeys([fold(v) for v in values if v]))
+        if self._fields.get(key) == values:
+            return
+        self.remove(key)
+        self._insert(key, values)
+        self._last = None
+
+    def add_many(self, items: Iterable[tuple[Hashable, Iterable[str]]]) -> None:
+        "pierwsze zbudowanie indeksu – klucze muszą być nowe"
+        for key, values in items:
+            self._insert(key, tuple(dict.fromkeys([fold(v) for v in values if v])))
+        self._last = None
+
+    def _insert(self, key: Hashable, values: tuple[str, ...]) -> None:
+        self._fields[key] = values
+        for value in values:
+            ids = self._ids.get(value)
+            if ids is None:
+                self._ids[value] = ids = set()
+                for g in _grams(value):
+                    self._grams.setdefault(g, set()).add(value)
+                for word in value.split():
+                    for p in {word[:1], word[:2]}:
+                        self._prefixes.setdefault(p, set()).add(value)
+            ids.add(key)
+
+    def remove(self, key: Hashable) -> None:
+        values = self._fields.pop(key, None)
+        if values is None:
+            return
+        for value in values:
+            ids = self._ids[value]
+            ids.discard(key)
+            if ids:
+                continue
+            del self._ids[value]
+            for g in _grams(value):
+                self._discard(self._grams, g, value)
+            for word in value.split():
+                for p in {word[:1], word[:2]}:
+                    self._discard(self._prefixes, p, value)
+        self._last = None
+
+    @staticmethod
+    def _discard(postings: dict[str, set[str]], token: str, value: str) -> None:
+        bucket = postings[token]
+        bucket.discard(value)
+        if not bucket:
+            del postings[token]
+
+    # ── zapytania ──────────────────────────────────────
+    def search(self, query: str) -> set[Hashable] | None:
+        "id pasujące do wszystkich słów zapytania; None = puste zapytanie (bez filtra)"
+        terms = fold(query).split()
+        if not terms:
+            return None
+        last = self._last
+        if last is not None and self._narrows(last[0], terms):
+            # użytkownik dopisał znaki – wystarczy przefiltrować poprzedni wynik
+            hits = {k for k in last[1] if all(self._matches(k, t) for t in terms)}
+        else:
+            hits = None
+            for term in sorted(terms, key=len, reverse=True):   # najdłuższe słowo najbardziej zawęża
+                ids = self._term(term)
+                hits = ids if hits is None else hits & ids
+                if not hits:
+                    break
+        self._last = (terms, hits)
+        return hits
+
+    def matches(self, key: Hashable, query: str) -> bool:
+        "sprawdzenie jednej encji (np. świeżo dodanej) bez przeszukiwania indeksu"
+        return key in self._fields and all(self._matches(key, t) for t in fold(query).split())
+
+    def _term(self, term: str) -> set[Hashable]:
+        if len(term) < 3:
+            values = (v for v in self._prefixes.get(term, ()) if any(w.startswith(term) for w in v.split()))
+        else:
+            rarest = min((self._grams.get(g, set()) for g in _grams(term)), key=len)
+            values = (v for v in rarest if term in v)
+        out: set[Hashable] = set()
+        for v in values:
+            out |= self._ids[v]
+        return out
+
+    def _matches(self, key: Hashable, term: str) -> bool:
+        if len(term) < 3:
+            return any(w.startswith(term) for v in self._fields[key] for w in v.split())
+        return any(term in v for v in self._fields[key])
+
+    @staticmethod
+    def _narrows(old: list[str], new: list[str]) -> bool:
+        "czy nowe zapytanie jest zawężeniem starego (te same słowa, ostatnie wydłużone lub dopisane)"
+        if len(new) < len(old) or new[:len(old) - 1] != old[:-1]:
+            return False
+        grown = new[len(old) - 1]
+        # krótkie słowo to prefiks, dłuższe – podciąg; "wa" → "war" zmienia znaczenie
+        return grown.startswith(old[-1]) and (len(old[-1]) >= 3 or len(grown) < 3)
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import math
+from typing import Hashable, Iterable, Iterator
+
+TILE_PX = 256
+CLUSTER_PX = 64             # rozmiar komórki klastra na ekranie
+CLUSTER_MAX_ZOOM = 19       # = max zoom mapy; te same współrzędne zostają jednym klastrem
+GRID_ZOOM = 12              # rozdzielczość kubełków GridIndex (kafelki OSM z poziomu 12)
+
+# (x0, y0, x1, y1) we współrzędnych Mercatora znormalizowanych do [0, 1]
+View = tuple[float, float, float, float]
+
+
+def mercator(lat: float, lon: float) -> tuple[float, float]:
+    "lat/lon → (x, y) w [0, 1], jak kafelki OSM"
+    lat = max(min(lat, 85.0511), -85.0511)
+    s = math.sin(math.radians(lat))
+    return (lon + 180.0) / 360.0, 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+
+
+def map_view(map_w, margin: float = 0.0) -> tuple[int, View]:
+    "aktualny zoom i widoczny obszar TkinterMapView (+ margines jako ułamek szerokości)"
+    zoom = round(map_w.zoom)
+    n = 2 ** zoom
+    (x0, y0), (x1, y1) = map_w.upper_left_tile_pos, map_w.lower_right_tile_pos
+    dx, dy = (x1 - x0) * margin, (y1 - y0) * margin
+    return zoom, ((x0 - dx) / n, (y0 - dy) / n, (x1 + dx) / n, (y1 + dy) / n)
+
+
+class GridIndex:
+    """Kubełki (kafelki OSM z poziomu ``GRID_ZOOM``) → klucze punktów.
+
+    Zapytanie o widok zwraca tylko punkty z kubełków przecinających widok,
+    więc koszt zależy od liczby widocznych punktów, a nie od całego zbioru.
+    """
+
+    def __init__(self, zoom: int = GRID_ZOOM):
+        self.n = 2 ** zoom
+        self.points: dict[Hashable, tuple[float, float, float, float]] = {}   # klucz → x, y, lat, lon
+        self._buckets: dict[tuple[int, int], dict[Hashable, None]] = {}
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def add(self, key: Hashable, lat: float, lon: float) -> None:
+        if key in self.points:
+            self.remove(key)
+        x, y = mercator(lat, lon)
+        self.points[key] = (x, y, lat, lon)
+        self._buckets.setdefault((int(x * self.n), int(y * self.n)), {})[key] = None
+
+    def remove(self, key: Hashable) -> None:
+        pt = self.points.pop(key, None)
+        if pt is None:
+            return
+        cell = (int(pt[0] * self.n), int(pt[1] * self.n))
+        bucket = self._buckets[cell]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[cell]
+
+    def sync(self, items: Iterable[tuple[Hashable, float, float]]) -> bool:
+        changed, seen = False, set()
+        for key, lat, lon in items:
+            seen.add(key)
+            pt = self.points.get(key)
+            if pt is None or pt[2] != lat or pt[3] != lon:
+                self.add(key, lat, lon); changed = True
+        for key in [k for k in self.points if k not in seen]:
+            self.remove(key); changed = True
+        return changed
+
+    def query(self, view: View | None) -> Iterator[tuple[Hashable, float, float]]:
+        "(klucz, lat, lon) dla punktów w widoku"
+        if view is None:
+            for key, (_, _, lat, lon) in self.points.items():
+                yield key, lat, lon
+            return
+        x0, y0, x1, y1 = view
+        cx0, cy0, cx1, cy1 = (int(v * self.n) for v in view)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self._buckets):
+            cells = [c for c in self._buckets if cx0 <= c[0] <= cx1 and cy0 <= c[1] <= cy1]
+        else:
+            cells = [c for c in ((cx, cy) for cx in range(cx0, cx1 + 1)
+                                 for cy in range(cy0, cy1 + 1)) if c in self._buckets]
+        for cell in cells:
+            edge = cell[0] in (cx0, cx1) or cell[1] in (cy0, cy1)
+            for key in self._buckets[cell]:
+                x, y, lat, lon = self.points[key]
+                if not edge or (x0 <= x <= x1 and y0 <= y <= y1):
+                    yield key, lat, lon
+
+
+class ClusterIndex:
+    """Klastrowanie punktów na siatce zależnej od zoomu.
+
+    Dla każdego odwiedzonego poziomu zoomu trzymamy agregaty komórek
+    (liczba, suma lat/lon, przykładowy element). Poziom liczony jest przy
+    pierwszym zapytaniu, potem aktualizowany przyrostowo przy add/remove,
+    a zapytanie o widok przegląda tylko komórki w tym widoku.
+    """
+
+    def __init__(self, cell_px: int = CLUSTER_PX, max_zoom: int = CLUSTER_MAX_ZOOM):
+        self.cell_px, self.max_zoom = cell_px, max_zoom
+        self.points: dict[Hashable, tuple[float, float, float, float]] = {}   # klucz → x, y, lat, lon
+        self._levels: dict[int, dict[tuple[int, int], list]] = {}
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _scale(self, zoom: int) -> float:
+        return (2 ** zoom) * TILE_PX / self.cell_px
+
+    # ── zmiany ─────────────────────────────────────────
+    def add(self, key: Hashable, lat: float, lon: float) -> None:
+        if key in self.points:
+            self.remove(key)
+        x, y = mercator(lat, lon)
+        self.points[key] = (x, y, lat, lon)
+        for zoom, cells in self._levels.items():
+            n = self._scale(zoom)
+            agg = cells.get((int(x * n), int(y * n)))
+            if agg is None:
+                cells[(int(x * n), int(y * n))] = [1, lat, lon, key]
+            else:
+                agg[0] += 1; agg[1] += lat; agg[2] += lon
+                if agg[3] is None: agg[3] = key
+
+    def remove(self, key: Hashable) -> None:
+        pt = self.points.pop(key, None)
+        if pt is None:
+            return
+        x, y, lat, lon = pt
+        for zoom, cells in self._levels.items():
+            n = self._scale(zoom)
+            cell = (int(x * n), int(y * n))
+            agg = cells[cell]
+            if agg[0] == 1:
+                del cells[cell]
+                continue
+            agg[0] -= 1; agg[1] -= lat; agg[2] -= lon
+            if agg[3] == key:
+                agg[3] = None           # uzupełniane leniwie, gdy zostanie jeden element
+
+    def sync(self, items: Iterable[tuple[Hashable, float, float]]) -> bool:
+        "dopasowanie do aktualnych danych – zmieniane są tylko różniące się punkty"
+        changed, seen = False, set()
+        for key, lat, lon in items:
+            seen.add(key)
+            pt = self.points.get(key)
+            if pt is None or pt[2] != lat or pt[3] != lon:
+                self.add(key, lat, lon); changed = True
+        for key in [k for k in self.points if k not in seen]:
+            self.remove(key); changed = True
+        return changed
+
+    # ── zapytania ──────────────────────────────────────
+    def clusters(self, zoom: int, view: View | None = None) -> Iterator[tuple[Hashable | None, float, float, int, tuple]]:
+        """(element albo None, lat, lon, liczność, klucz komórki).
+
+        Dla liczności 1 zwracany jest sam element z jego współrzędnymi.
+        """
+        if zoom > self.max_zoom:
+            for key, (x, y, lat, lon) in self.points.items():
+                if view is None or (view[0] <= x <= view[2] and view[1] <= y <= view[3]):
+                    yield key, lat, lon, 1, (zoom, key)
+            return
+        cells = self._level(zoom)
+        n = self._scale(zoom)
+        if view is None:
+            it = iter(cells.items())
+        else:
+            cx0, cy0, cx1, cy1 = (int(v * n) for v in view)
+            if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(cells):
+                # widok większy niż liczba zajętych komórek – taniej przejrzeć komórki
+                it = ((c, a) for c, a in cells.items()
+                      if cx0 <= c[0] <= cx1 and cy0 <= c[1] <= cy1)
+            else:
+                it = ((c, cells[c]) for c in ((cx, cy) for cx in range(cx0, cx1 + 1)
+                                              for cy in range(cy0, cy1 + 1)) if c in cells)
+        for cell, agg in it:
+            count = agg[0]
+            if count == 1:
+                key = agg[3] if agg[3] is not None else self._member(zoom, cell)
+                agg[3] = key
+                _, _, lat, lon = self.points[key]
+                yield key, lat, lon, 1, (zoom, *cell)
+            else:
+                yield None, agg[1] / count, agg[2] / count, count, (zoom, *cell)
+
+    def _level(self, zoom: int) -> dict[tuple[int, int], list]:
+        cells = self._levels.get(zoom)
+        if cells is None:
+            cells, n = {}, self._scale(zoom)
+            for key, (x, y, lat, lon) in self.points.items():
+                cell = (int(x * n), int(y * n))
+                agg = cells.get(cell)
+                if agg is None:
+                    cells[cell] = [1, lat, lon, key]
+                else:
+                    agg[0] += 1; agg[1] += lat; agg[2] += lon
+            self._levels[zoom] = cells
+        return cells
+
+    def _member(self, zoom: int, cell: tuple[int, int]) -> Hashable:
+        n = self._scale(zoom)
+        return next(k for k, (x, y, _, _) in self.points.items()
+                    if (int(x * n), int(y * n)) == cell)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+from collections.abc import Iterable, Iterator
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "siec.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stores (
+    id       INTEGER PRIMARY KEY,
+    name     TEXT NOT NULL,
+    address  TEXT NOT NULL,
+    lat      REAL,
+    lon      REAL
+);
+CREATE TABLE IF NOT EXISTS employees (
+    id       INTEGER PRIMARY KEY,
+    fullname TEXT NOT NULL,
+    position TEXT NOT NULL,
+    location TEXT NOT NULL,
+    store_id INTEGER REFERENCES stores(id) ON DELETE CASCADE,
+    lat      REAL,
+    lon      REAL
+);
+CREATE TABLE IF NOT EXISTS suppliers (
+    id       INTEGER PRIMARY KEY,
+    name     TEXT NOT NULL,
+    category TEXT NOT NULL,
+    location TEXT NOT NULL,
+    store_id INTEGER REFERENCES stores(id) ON DELETE CASCADE,
+    lat      REAL,
+    lon      REAL
+);
+CREATE INDEX IF NOT EXISTS employees_store    ON employees(store_id);
+CREATE INDEX IF NOT EXISTS employees_location ON employees(location);
+CREATE INDEX IF NOT EXISTS suppliers_store    ON suppliers(store_id);
+CREATE INDEX IF NOT EXISTS suppliers_location ON suppliers(location);
+CREATE INDEX IF NOT EXISTS suppliers_category ON suppliers(category);
+"""
+
+# kolumny zapisywane dla każdego typu (bez id)
+COLUMNS = {
+    "stores":    ("name", "address", "lat", "lon"),
+    "employees": ("fullname", "position", "location", "store_id", "lat", "lon"),
+    "suppliers": ("name", "category", "location", "store_id", "lat", "lon"),
+}
+
+
+# rodzaj encji (atrybut klasy ``kind``) → tabela
+TABLES = {"store": "stores", "employee": "employees", "supplier": "suppliers"}
+
+
+def _table(entity) -> str:
+    return TABLES[entity.kind]
+
+
+def _values(table: str, entity) -> tuple:
+    if table == "stores":
+        return entity.name, entity.address, entity.lat, entity.lon
+    store_id = entity.store.id if entity.store is not None else None
+    first = entity.fullname if table == "employees" else entity.name
+    second = entity.position if table == "employees" else entity.category
+    return first, second, entity.location, store_id, entity.lat, entity.lon
+
+
+class Storage:
+    """Trwały zapis sieci (SQLite).
+
+    Każda operacja CRUD zapisuje tylko zmienioną encję; ``id`` encji to
+    klucz w bazie (None = jeszcze niezapisana).
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+
+    # ── odczyt ─────────────────────────────────────────
+    def is_empty(self) -> bool:
+        return self._db.execute("SELECT 1 FROM stores LIMIT 1").fetchone() is None
+
+    def data_version(self) -> int:
+        "zmienia się, gdy inne połączenie (np. aplikacja) zapisze coś do bazy"
+        return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def rows(self, table: str, batch: int = 5000) -> Iterator[tuple]:
+        "(id, *COLUMNS[table]) – strumieniowo, bez ładowania całej tabeli naraz"
+        cur = self._db.execute(f"SELECT id, {', '.join(COLUMNS[table])} FROM {table} ORDER BY id")
+        while chunk := cur.fetchmany(batch):
+            yield from chunk
+
+    # ── zapis przyrostowy ──────────────────────────────
+    def save(self, entity) -> None:
+        with self._db:
+            self._save(entity)
+
+    def save_many(self, entities: Iterable) -> None:
+        "jedna transakcja, np. partia importu"
+        with self._db:
+            for entity in entities:
+                self._save(entity)
+
+    def delete(self, entity) -> None:
+        "usunięcie sklepu usuwa też jego pracowników i dostawców (ON DELETE CASCADE)"
+        if entity.id is None:
+            return
+        with self._db:
+            self._db.execute(f"DELETE FROM {_table(entity)} WHERE id=?", (entity.id,))
+        entity.id = None
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _save(self, entity) -> None:
+        table = _table(entity)
+        cols, vals = COLUMNS[table], _values(table, entity)
+        if entity.id is None:
+            cur = self._db.execute(
+                f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})", vals)
+            entity.id = cur.lastrowid
+        else:
+            self._db.execute(
+                f"UPDATE {table} SET {', '.join(c + '=?' for c in cols)} WHERE id=?", (*vals, entity.id))
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+
+Coords = tuple[float, float]
+
+CHUNK = 16 * 1024
+OVERLAP = 512                   # znacznik przecięty granicą paczki szukamy jeszcze raz
+
+# <span class="latitude">52°13′56″N</span> … <span class="latitude">52,232222</span>
+_SPAN = re.compile(rb'class="(latitude|longitude)"[^>]{0,200}>([^<]{1,40})<')
+_DMS = re.compile(r"(\d+(?:[.,]\d+)?)°(?:\s*(\d+(?:[.,]\d+)?)[′'])?(?:\s*(\d+(?:[.,]\d+)?)[″\"])?\s*([NSEWnsew])?")
+
+
+def parse_coord(text: str) -> float:
+    "'52,232222' albo '52°13′56″N' → 52.23…"
+    text = text.strip()
+    m = _DMS.match(text)
+    if m is None:
+        return float(text.replace(",", "."))
+    deg, minutes, seconds, hemi = m.groups()
+    value = sum(float(v.replace(",", ".")) / div
+                for v, div in ((deg, 1), (minutes, 60), (seconds, 3600)) if v)
+    return -value if hemi and hemi.upper() in "SW" else value
+
+
+def extract_coords(chunks: Iterable[bytes]) -> Coords | None:
+    """Współrzędne z HTML artykułu pl.wikipedii czytanego paczkami.
+
+    Bierze drugie wystąpienie ``.latitude``/``.longitude`` (wartość dziesiętna
+    w bloku współrzędnych, jak dotychczasowy parser) i przestaje czytać, gdy
+    je ma – reszta artykułu nie jest ani pobierana, ani parsowana.
+    """
+    found: dict[bytes, list[bytes]] = {b"latitude": [], b"longitude": []}
+    buf = b""
+    for chunk in chunks:
+        start = max(0, len(buf) - OVERLAP)
+        buf += chunk
+        end = start
+        for m in _SPAN.finditer(buf, start):
+            found[m.group(1)].append(m.group(2))
+            end = m.end()
+            if len(found[b"latitude"]) >= 2 and len(found[b"longitude"]) >= 2:
+                lat, lon = found[b"latitude"][1], found[b"longitude"][1]
+                try:
+                    return parse_coord(lat.decode()), parse_coord(lon.decode())
+                except (UnicodeDecodeError, ValueError):
+                    return None
+        # zostawiamy tylko ogon – pamięć nie rośnie z długością strony
+        buf = buf[max(end, len(buf) - OVERLAP):]
+    return None